@@ -1,28 +1,285 @@
-from fastapi import FastAPI, APIRouter, File, UploadFile, HTTPException, Form
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi import FastAPI, APIRouter, Depends, File, UploadFile, HTTPException, Form, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse, PlainTextResponse, Response, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, monitoring
+from pymongo.errors import BulkWriteError
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any, Tuple, Union
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 import shutil
+import threading
+import time
 import mimetypes
 import base64
+import hashlib
+import hmac
+import cProfile
+import random
+import urllib.parse
 import json
+import copy
 from io import BytesIO
+from collections import OrderedDict, deque
 import aiofiles
+import zlib
+import functools
+import itertools
+import zipfile
+import mmap
+import struct
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import asyncio
+import bisect
+import heapq
+import math
+import re
+import unicodedata
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Opt-in response fast path: orjson serialization without response-model
+# re-validation, and gzip/brotli compression of JSON bodies
+FAST_JSON = os.environ.get("FAST_JSON", "0") == "1" and orjson is not None
+RESPONSE_COMPRESSION = os.environ.get("RESPONSE_COMPRESSION", "0") == "1"
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+# Prometheus-style metrics, rendered in the text exposition format at /metrics
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Metric:
+    """A counter, gauge or histogram keyed by label values.
+
+    Thread-safe because Mongo command events are reported from driver threads.
+    """
+
+    def __init__(self, name: str, kind: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.kind = kind
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series: Dict[Tuple[Tuple[str, str], ...], Any] = {}
+        self.lock = threading.Lock()
+        metrics_registry.append(self)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.series[key] = self.series.get(key, 0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self.lock:
+            self.series[tuple(sorted(labels.items()))] = value
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.series.setdefault(key, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self) -> List[str]:
+        def label_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{str(v)}"' for k, v in pairs) + "}"
+
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            for labels, value in sorted(self.series.items()):
+                if self.kind != "histogram":
+                    lines.append(f"{self.name}{label_text(labels)} {value}")
+                    continue
+                for bound, count in zip(self.buckets, value["buckets"]):
+                    lines.append(f"{self.name}_bucket{label_text(labels, [('le', bound)])} {count}")
+                lines.append(f"{self.name}_bucket{label_text(labels, [('le', '+Inf')])} {value['count']}")
+                lines.append(f"{self.name}_sum{label_text(labels)} {value['sum']}")
+                lines.append(f"{self.name}_count{label_text(labels)} {value['count']}")
+        return lines
+
+metrics_registry: List[Metric] = []
+
+REQUEST_LATENCY = Metric("http_request_duration_seconds", "histogram", "HTTP request latency by route and status")
+REQUESTS_IN_FLIGHT = Metric("http_requests_in_flight", "gauge", "HTTP requests currently being served")
+EXPORT_QUEUE_DEPTH = Metric("export_queue_depth", "gauge", "Export jobs waiting or rendering")
+RENDER_DURATION = Metric("render_duration_seconds", "histogram", "Export render time by template type")
+UPLOAD_BYTES = Metric("upload_bytes_total", "counter", "Bytes received by uploads")
+DOWNLOAD_BYTES = Metric("download_bytes_total", "counter", "Bytes served by downloads")
+RENDER_QUEUE_DEPTH = Metric("render_queue_depth", "gauge", "Render jobs waiting for a worker by priority class")
+RENDER_QUEUE_WAIT = Metric("render_queue_wait_seconds", "histogram", "Time render jobs spend queued by priority class")
+ADMISSION_IN_FLIGHT = Metric("admission_in_flight", "gauge", "Admitted requests being served by endpoint class")
+ADMISSION_QUEUED = Metric("admission_queued", "gauge", "Requests waiting for admission by endpoint class")
+ADMISSION_REJECTIONS = Metric("admission_rejections_total", "counter", "Requests turned away by endpoint class and status")
+EXPORT_DISK_BYTES = Metric("export_disk_bytes", "gauge", "Bytes held by tracked export artifacts")
+MONGO_COMMAND_LATENCY = Metric("mongo_command_duration_seconds", "histogram", "Mongo command latency by command and outcome")
+
+# Slow-query log: commands slower than SLOW_QUERY_MS are grouped by filter shape
+# (the filter with every value replaced by "?"), and the first occurrence of each
+# shape is explained so collection scans show up at /api/admin/slow-queries.
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "100"))  # negative disables
+SLOW_QUERY_LOG_SIZE = 500
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+SLOW_QUERY_COLLECTION = "slow_query_shapes"
+COMMAND_ENVELOPE_FIELDS = {"lsid", "$db", "$clusterTime", "txnNumber", "$readPreference", "readConcern", "writeConcern", "comment", "apiVersion"}
+
+def query_shape(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: query_shape(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        shapes = [query_shape(v) for v in value]
+        # Lists of plain values ($in, $nin) collapse so their length doesn't create new shapes
+        return shapes if any(isinstance(v, (dict, list)) for v in shapes) else ["?"]
+    return "?"
+
+def plan_stages(plan: Any) -> List[str]:
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for v in plan.values():
+            stages.extend(plan_stages(v))
+    elif isinstance(plan, list):
+        for v in plan:
+            stages.extend(plan_stages(v))
+    return stages
+
+class SlowQueryLog:
+    def __init__(self):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.pending: Dict[Tuple[int, Any], Dict[str, Any]] = {}
+        self.recent: deque = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+        self.shapes: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+
+    def started(self, event):
+        if self.loop is None or event.command_name not in EXPLAINABLE_COMMANDS:
+            return
+        collection = event.command.get(event.command_name)
+        if collection == SLOW_QUERY_COLLECTION:
+            return
+        with self.lock:
+            self.pending[(event.request_id, event.connection_id)] = {
+                "command": {k: v for k, v in event.command.items() if k not in COMMAND_ENVELOPE_FIELDS},
+                "database": event.database_name
+            }
+
+    def finished(self, event):
+        with self.lock:
+            pending = self.pending.pop((event.request_id, event.connection_id), None)
+        duration_ms = event.duration_micros / 1000
+        if pending is None or duration_ms < SLOW_QUERY_MS:
+            return
+        command = pending["command"]
+        name = event.command_name
+        shape = query_shape({
+            k: v for k, v in command.items()
+            if k in ("filter", "query", "pipeline", "updates", "deletes", "sort", "key", "update")
+        })
+        collection = command.get(name)
+        key = hashlib.sha1(json.dumps([collection, name, shape], sort_keys=True, default=str).encode()).hexdigest()[:16]
+        entry = {"shape_id": key, "collection": collection, "command": name, "duration_ms": round(duration_ms, 3), "at": datetime.utcnow()}
+        self.loop.call_soon_threadsafe(self.record, entry, shape, command, pending["database"])
+
+    def record(self, entry: Dict[str, Any], shape: Any, command: Dict[str, Any], database: str):
+        self.recent.append(entry)
+        known = self.shapes.get(entry["shape_id"])
+        if known:
+            known["count"] += 1
+            known["total_ms"] += entry["duration_ms"]
+            known["max_ms"] = max(known["max_ms"], entry["duration_ms"])
+            known["last_seen"] = entry["at"]
+            return
+        self.shapes[entry["shape_id"]] = {
+            "shape_id": entry["shape_id"],
+            "collection": entry["collection"],
+            "command": entry["command"],
+            "shape": shape,
+            "count": 1,
+            "total_ms": entry["duration_ms"],
+            "max_ms": entry["duration_ms"],
+            "first_seen": entry["at"],
+            "last_seen": entry["at"],
+            "explain": None
+        }
+        asyncio.ensure_future(self.explain(entry["shape_id"], command, database))
+
+    async def explain(self, shape_id: str, command: Dict[str, Any], database: str):
+        shape = self.shapes[shape_id]
+        try:
+            explain = await client[database].command({"explain": command, "verbosity": "queryPlanner"})
+            planner = explain.get("queryPlanner") or explain.get("stages") or explain
+            stages = plan_stages(planner.get("winningPlan") if isinstance(planner, dict) and "winningPlan" in planner else planner)
+            shape["explain"] = {
+                "stages": stages,
+                "collection_scan": "COLLSCAN" in stages,
+                "query_planner": json.loads(json.dumps(planner, default=str))
+            }
+        except Exception as e:
+            shape["explain"] = {"error": str(e)}
+        try:
+            # Shapes and plans contain $-prefixed keys, so they are stored as JSON text
+            stored = {**shape, "shape": json.dumps(shape["shape"]), "explain": json.dumps(shape["explain"], default=str)}
+            await db[SLOW_QUERY_COLLECTION].replace_one({"shape_id": shape_id}, stored, upsert=True)
+        except Exception as e:
+            logger.warning(f"Failed to store slow query shape: {e}")
+
+slow_query_log = SlowQueryLog()
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    def started(self, event):
+        if SLOW_QUERY_MS >= 0:
+            slow_query_log.started(event)
+
+    def succeeded(self, event):
+        MONGO_COMMAND_LATENCY.observe(event.duration_micros / 1e6, command=event.command_name, status="succeeded")
+        if SLOW_QUERY_MS >= 0:
+            slow_query_log.finished(event)
+
+    def failed(self, event):
+        MONGO_COMMAND_LATENCY.observe(event.duration_micros / 1e6, command=event.command_name, status="failed")
+        if SLOW_QUERY_MS >= 0:
+            slow_query_log.finished(event)
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# Pool sizing: admission control below keeps heavy writers from holding most
+# of these, and the wait-queue timeout turns pool exhaustion into a fast error
+client = AsyncIOMotorClient(
+    mongo_url,
+    event_listeners=[MongoCommandMetrics()],
+    maxPoolSize=int(os.environ.get("MONGO_MAX_POOL_SIZE", "100")),
+    minPoolSize=int(os.environ.get("MONGO_MIN_POOL_SIZE", "10")),
+    maxConnecting=int(os.environ.get("MONGO_MAX_CONNECTING", "4")),
+    maxIdleTimeMS=int(os.environ.get("MONGO_MAX_IDLE_TIME_MS", "300000")),
+    waitQueueTimeoutMS=int(os.environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000"))
+)
 db = client[os.environ['DB_NAME']]
 
 # Create uploads directory
@@ -40,6 +297,14 @@ app = FastAPI()
 api_router = APIRouter(prefix="/api")
 
 # Define Models
+class ZipEntry(BaseModel):
+    name: str
+    size: int
+    compressed_size: int
+    method: int  # 0 stored, 8 deflate
+    crc32: int
+    offset: int  # local file header position
+
 class MotionGraphic(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     title: str
@@ -50,6 +315,13 @@ class MotionGraphic(BaseModel):
     file_path: str
     file_size: int
     duration: Optional[float] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    fps: Optional[float] = None
+    codec: Optional[str] = None
+    phash: Optional[str] = None  # hex perceptual hash of sampled frames
+    duplicate_of: Optional[str] = None  # closest near-duplicate found at upload
+    zip_entries: Optional[List[ZipEntry]] = None  # packs only; left out of gallery listings
     thumbnail_base64: Optional[str] = None
     download_count: int = 0
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -71,16 +343,80 @@ class AnimatedProject(BaseModel):
     template_id: str
     name: str
     config: Dict[str, Any] = {}
+    version: int = 1
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
+class BulkProjectItem(BaseModel):
+    name: str
+    config: Dict[str, Any] = {}
+
+class BulkProjectCreate(BaseModel):
+    template_id: str
+    projects: List[BulkProjectItem]
+
+class BulkProjectClone(BaseModel):
+    project_ids: List[str]
+    copies: int = Field(default=1, ge=1)
+    name_suffix: str = " (copy)"
+
+class BulkProjectDelete(BaseModel):
+    ids: Optional[List[str]] = None
+    template_id: Optional[str] = None
+    name_prefix: Optional[str] = None
+
+# Render bounds; frame count and raster memory grow with these, so requests
+# beyond them are rejected at validation rather than tying up a render worker
+EXPORT_MAX_WIDTH = int(os.environ.get("EXPORT_MAX_WIDTH", "3840"))
+EXPORT_MAX_HEIGHT = int(os.environ.get("EXPORT_MAX_HEIGHT", "2160"))
+EXPORT_MAX_DURATION_MS = int(os.environ.get("EXPORT_MAX_DURATION_MS", "120000"))
+PREVIEW_MAX_WIDTH = 480
+PREVIEW_MAX_HEIGHT = 360
+
+ExportFormat = Literal["mp4", "gif", "webm", "vector"]
+ExportQuality = Literal["low", "medium", "high"]
+
 class ExportRequest(BaseModel):
     project_id: str
-    format: str = "mp4"  # "mp4", "gif", "webm"
-    duration: int = 5000  # milliseconds
-    width: int = 800
-    height: int = 600
-    quality: str = "high"  # "low", "medium", "high"
+    format: ExportFormat = "mp4"
+    duration: int = Field(default=5000, gt=0, le=EXPORT_MAX_DURATION_MS)  # milliseconds
+    width: int = Field(default=800, gt=0, le=EXPORT_MAX_WIDTH)
+    height: int = Field(default=600, gt=0, le=EXPORT_MAX_HEIGHT)
+    quality: ExportQuality = "high"
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+class MotionGraphicFacets(BaseModel):
+    category: List[FacetCount] = []
+    format: List[FacetCount] = []
+    tags: List[FacetCount] = []
+
+class FacetedMotionGraphics(BaseModel):
+    results: List[MotionGraphic]
+    total: int
+    facets: MotionGraphicFacets
+
+class BatchExportRequest(BaseModel):
+    project_id: str
+    overrides: List[Dict[str, Any]] = []  # one variant per entry
+    sweep: Dict[str, List[Any]] = {}  # cartesian product over these params
+    format: ExportFormat = "mp4"
+    duration: int = Field(default=5000, gt=0, le=EXPORT_MAX_DURATION_MS)
+    width: int = Field(default=800, gt=0, le=EXPORT_MAX_WIDTH)
+    height: int = Field(default=600, gt=0, le=EXPORT_MAX_HEIGHT)
+    quality: ExportQuality = "high"
+    archive: bool = False  # one zip instead of per-variant downloads
+
+class PreviewRequest(BaseModel):
+    config: Dict[str, Any] = {}  # unsaved edits layered over the project config
+    frames: int = Field(default=6, ge=1, le=24)
+    width: int = Field(default=200, gt=0, le=PREVIEW_MAX_WIDTH)
+    height: int = Field(default=150, gt=0, le=PREVIEW_MAX_HEIGHT)
+    duration: int = Field(default=5000, gt=0, le=EXPORT_MAX_DURATION_MS)
+    quality: ExportQuality = "high"  # picks the export frame grid the preview samples from
+    layout: Literal["sprite", "frames"] = "sprite"  # one PNG strip, or a base64 PNG per frame
 
 class MotionGraphicCreate(BaseModel):
     title: str
@@ -118,6 +454,9 @@ CATEGORIES = [
     "other"
 ]
 
+# Number of tags returned in the tags facet of the gallery listing
+FACET_TAGS_LIMIT = 20
+
 # Template categories
 TEMPLATE_CATEGORIES = [
     "business",
@@ -450,43 +789,136 @@ DEFAULT_TEMPLATES = [
     }
 ]
 
+def fields_projection(fields: Optional[str], model) -> Optional[Dict[str, int]]:
+    """Turn a comma-separated ``fields=`` parameter into a Mongo projection.
+
+    Returns None when no fields were requested and the fast JSON path is off.
+    ``id`` is always included.
+    """
+    if not fields:
+        # The fast path returns DB documents as-is, so only _id needs stripping
+        return {"_id": 0} if FAST_JSON else None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in model.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {unknown}. Must be among: {list(model.model_fields)}")
+    projection = {"_id": 0, "id": 1}
+    projection.update({f: 1 for f in requested})
+    return projection
+
+def document_response(content: Any) -> Response:
+    # DB documents are returned as-is, skipping response-model validation; partial
+    # documents from fields= would be rejected by the model anyway
+    if FAST_JSON:
+        return ORJSONResponse(content)
+    return JSONResponse(content=jsonable_encoder(content))
+
 @api_router.get("/")
 async def root():
     return {"message": "Motion Graphics Studio API - Enhanced Edition"}
 
+# HTTP caching for the catalog endpoints. Their content only changes on deploy or
+# template re-seed, so responses are cached as bytes per URL and tagged with an
+# ETag derived from the catalog version.
+CATALOG_MAX_AGE = int(os.environ.get("CATALOG_MAX_AGE", "300"))
+CATALOG_STALE_WHILE_REVALIDATE = int(os.environ.get("CATALOG_STALE_WHILE_REVALIDATE", "86400"))
+CATALOG_CACHE_MAX_ENTRIES = 256  # LRU bound on distinct (path, params) bodies
+
+catalog_version = ""
+catalog_cache: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+
+async def refresh_catalog_version():
+    global catalog_version
+    templates = await db.animated_templates.find({}, {"_id": 0, "id": 1, "created_at": 1}).sort("id", 1).to_list(None)
+    fingerprint = json.dumps([CATEGORIES, TEMPLATE_CATEGORIES, DEFAULT_TEMPLATES, templates], default=str, sort_keys=True)
+    catalog_version = hashlib.sha256(fingerprint.encode()).hexdigest()[:16]
+    catalog_cache.clear()
+
+def catalog_cache_key(path: str, params: Dict[str, Optional[str]]) -> str:
+    """Key on the endpoint's own parameters only, so unknown or reordered query
+    parameters cannot multiply cache entries"""
+    normalized = {}
+    for name, value in params.items():
+        if value is None:
+            continue
+        if name == "fields":
+            value = ",".join(sorted({f.strip() for f in value.split(",") if f.strip()}))
+        normalized[name] = value
+    return path + "?" + urllib.parse.urlencode(sorted(normalized.items()))
+
+async def catalog_response(request: Request, build, **params: Optional[str]) -> Response:
+    key = catalog_cache_key(request.url.path, params)
+    cached = catalog_cache.get(key)
+    if cached is None:
+        result = await build()
+        body = result.body if isinstance(result, Response) else JSONResponse(content=jsonable_encoder(result)).body
+        # build() may re-seed templates, which bumps the version. The tag is
+        # weak because the compression middleware re-encodes the body
+        etag = f'W/"{catalog_version}-{hashlib.sha256(key.encode()).hexdigest()[:12]}"'
+        cached = (etag, body)
+        catalog_cache[key] = cached
+        if len(catalog_cache) > CATALOG_CACHE_MAX_ENTRIES:
+            catalog_cache.popitem(last=False)
+    else:
+        catalog_cache.move_to_end(key)
+    etag, body = cached
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={CATALOG_MAX_AGE}, stale-while-revalidate={CATALOG_STALE_WHILE_REVALIDATE}"
+    }
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+    if etag[2:] in [tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @api_router.get("/categories")
-async def get_categories():
-    return {"categories": CATEGORIES}
+async def get_categories(request: Request):
+    async def build():
+        return {"categories": CATEGORIES}
+    return await catalog_response(request, build)
 
 @api_router.get("/template-categories")
-async def get_template_categories():
-    return {"categories": TEMPLATE_CATEGORIES}
+async def get_template_categories(request: Request):
+    async def build():
+        return {"categories": TEMPLATE_CATEGORIES}
+    return await catalog_response(request, build)
 
 # Animation Templates Endpoints
+async def seed_default_templates():
+    for template_data in DEFAULT_TEMPLATES:
+        template = AnimatedTemplate(**template_data)
+        await db.animated_templates.insert_one(template.dict())
+    await rebuild_stats()
+    await refresh_catalog_version()
+
 @api_router.get("/templates", response_model=List[AnimatedTemplate])
-async def get_templates(category: Optional[str] = None):
-    templates = await db.animated_templates.find().to_list(None)
+async def get_templates(request: Request, category: Optional[str] = None, fields: Optional[str] = None):
+    return await catalog_response(request, lambda: load_templates(category, fields), category=category, fields=fields)
+
+async def load_templates(category: Optional[str], fields: Optional[str]):
+    projection = fields_projection(fields, AnimatedTemplate)
+    query = {"category": category} if category else {}
+    templates = await db.animated_templates.find(query, projection).to_list(None)
     
     # If no templates in DB, initialize with defaults
-    if not templates:
-        for template_data in DEFAULT_TEMPLATES:
-            template = AnimatedTemplate(**template_data)
-            await db.animated_templates.insert_one(template.dict())
-            templates.append(template)
-    else:
-        templates = [AnimatedTemplate(**t) for t in templates]
-    
-    # Filter by category if provided
-    if category:
-        templates = [t for t in templates if t.category == category]
+    if not templates and await db.animated_templates.count_documents({}) == 0:
+        await seed_default_templates()
+        templates = await db.animated_templates.find(query, projection).to_list(None)
     
-    return templates
+    if projection:
+        return document_response(templates)
+    return [AnimatedTemplate(**t) for t in templates]
 
 @api_router.get("/templates/{template_id}", response_model=AnimatedTemplate)
-async def get_template(template_id: str):
-    template = await db.animated_templates.find_one({"id": template_id})
+async def get_template(request: Request, template_id: str):
+    return await catalog_response(request, lambda: load_template(template_id))
+
+async def load_template(template_id: str):
+    template = await db.animated_templates.find_one({"id": template_id}, {"_id": 0})
     if not template:
         raise HTTPException(status_code=404, detail="Template not found")
+    if FAST_JSON:
+        return document_response(template)
     return AnimatedTemplate(**template)
 
 # Animated Projects Endpoints
@@ -499,18 +931,25 @@ async def create_project(project_data: AnimatedProjectCreate):
     
     project = AnimatedProject(**project_data.dict())
     await db.animated_projects.insert_one(project.dict())
+    await db.project_versions.insert_one(project_snapshot(project.dict()))
+    await bump_stats({"total_projects": 1, f"template_usage.{project.template_id}": 1})
     return project
 
 @api_router.get("/projects", response_model=List[AnimatedProject])
-async def get_projects():
-    projects = await db.animated_projects.find().to_list(None)
+async def get_projects(fields: Optional[str] = None):
+    projection = fields_projection(fields, AnimatedProject)
+    projects = await db.animated_projects.find({}, projection).to_list(None)
+    if projection:
+        return document_response(projects)
     return [AnimatedProject(**p) for p in projects]
 
 @api_router.get("/projects/{project_id}", response_model=AnimatedProject)
 async def get_project(project_id: str):
-    project = await db.animated_projects.find_one({"id": project_id})
+    project = await db.animated_projects.find_one({"id": project_id}, {"_id": 0})
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
+    if FAST_JSON:
+        return document_response(project)
     return AnimatedProject(**project)
 
 @api_router.put("/projects/{project_id}", response_model=AnimatedProject)
@@ -520,28 +959,1038 @@ async def update_project(project_id: str, update_data: AnimatedProjectUpdate):
         raise HTTPException(status_code=404, detail="Project not found")
     
     update_dict = {k: v for k, v in update_data.dict().items() if v is not None}
-    update_dict["updated_at"] = datetime.utcnow()
-    
-    if update_dict:
-        await db.animated_projects.update_one(
-            {"id": project_id},
-            {"$set": update_dict}
-        )
+    if not any(field in update_dict for field in VERSIONED_FIELDS):
+        update_dict["updated_at"] = datetime.utcnow()
+        await db.animated_projects.update_one({"id": project_id}, {"$set": update_dict})
+        updated_project = await db.animated_projects.find_one({"id": project_id})
+        return AnimatedProject(**updated_project)
     
-    updated_project = await db.animated_projects.find_one({"id": project_id})
-    return AnimatedProject(**updated_project)
+    return AnimatedProject(**await apply_project_changes(existing_project, update_dict))
 
 @api_router.delete("/projects/{project_id}")
 async def delete_project(project_id: str):
-    result = await db.animated_projects.delete_one({"id": project_id})
-    if result.deleted_count == 0:
+    project = await db.animated_projects.find_one_and_delete({"id": project_id})
+    if not project:
         raise HTTPException(status_code=404, detail="Project not found")
+    await db.project_versions.delete_many({"project_id": project_id})
+    await bump_stats({"total_projects": -1, f"template_usage.{project['template_id']}": -1})
     return {"message": "Project deleted successfully"}
 
+# Project version history. Each change to a project's name or config appends
+# a version to project_versions holding a JSON patch against the previous
+# version; every PROJECT_SNAPSHOT_INTERVAL-th version (and any version whose
+# patch would be larger than the state itself) is stored whole instead, so
+# reconstructing a version replays at most PROJECT_SNAPSHOT_INTERVAL - 1 patches.
+PROJECT_SNAPSHOT_INTERVAL = int(os.environ.get("PROJECT_SNAPSHOT_INTERVAL", "20"))
+VERSIONED_FIELDS = ("name", "config")
+
+def version_state(project: Dict[str, Any]) -> Dict[str, Any]:
+    return {field: project.get(field) for field in VERSIONED_FIELDS}
+
+def json_diff(old: Any, new: Any, path: Tuple = ()) -> List[Dict[str, Any]]:
+    """Patch operations (add/remove/replace at a key path) turning ``old`` into ``new``"""
+    if type(old) is not type(new):
+        return [{"op": "replace", "path": list(path), "value": new}]
+    if isinstance(old, dict):
+        ops = [{"op": "remove", "path": list(path + (key,))} for key in old if key not in new]
+        for key, value in new.items():
+            if key not in old:
+                ops.append({"op": "add", "path": list(path + (key,)), "value": value})
+            else:
+                ops.extend(json_diff(old[key], value, path + (key,)))
+        return ops
+    if isinstance(old, list):
+        ops = []
+        for index in range(min(len(old), len(new))):
+            ops.extend(json_diff(old[index], new[index], path + (index,)))
+        ops.extend({"op": "add", "path": list(path + (index,)), "value": new[index]} for index in range(len(old), len(new)))
+        # Trailing removals go last-first so the indices stay valid
+        ops.extend({"op": "remove", "path": list(path + (index,))} for index in range(len(old) - 1, len(new) - 1, -1))
+        return ops
+    return [] if old == new else [{"op": "replace", "path": list(path), "value": new}]
+
+def apply_patch(document: Any, ops: List[Dict[str, Any]]) -> Any:
+    document = copy.deepcopy(document)
+    for op in ops:
+        if not op["path"]:
+            document = copy.deepcopy(op["value"])
+            continue
+        parent = document
+        for key in op["path"][:-1]:
+            parent = parent[key]
+        key = op["path"][-1]
+        if op["op"] == "remove":
+            del parent[key]
+        elif op["op"] == "add" and isinstance(parent, list):
+            parent.insert(key, copy.deepcopy(op["value"]))
+        else:
+            parent[key] = copy.deepcopy(op["value"])
+    return document
+
+def project_snapshot(project: Dict[str, Any], version: int = 1) -> Dict[str, Any]:
+    return {
+        "project_id": project["id"],
+        "version": version,
+        "kind": "snapshot",
+        "state": version_state(project),
+        "created_at": datetime.utcnow()
+    }
+
+def project_version_record(project_id: str, version: int, old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    record = {"project_id": project_id, "version": version, "created_at": datetime.utcnow()}
+    patch = json_diff(old, new)
+    # Versions 1, 1 + INTERVAL, 1 + 2 * INTERVAL, ... are snapshots
+    if (version - 1) % PROJECT_SNAPSHOT_INTERVAL == 0 or len(json.dumps(patch, default=str)) >= len(json.dumps(new, default=str)):
+        return {**record, "kind": "snapshot", "state": new}
+    return {**record, "kind": "diff", "patch": patch}
+
+async def ensure_version_history(project: Dict[str, Any]) -> Dict[str, Any]:
+    """Give projects created before versioning their first snapshot"""
+    if "version" in project:
+        return project
+    await db.project_versions.update_one(
+        {"project_id": project["id"], "version": 1},
+        {"$setOnInsert": project_snapshot(project)},
+        upsert=True
+    )
+    await db.animated_projects.update_one({"id": project["id"], "version": {"$exists": False}}, {"$set": {"version": 1}})
+    return {**project, "version": 1}
+
+async def apply_project_changes(project: Dict[str, Any], changes: Dict[str, Any]) -> Dict[str, Any]:
+    """Update a project and record the change as its next version.
+
+    Changes that leave the versioned state as it is (a repeated autosave) are
+    not written at all. The update is conditional on the version it was diffed
+    against, so a concurrent edit makes it re-read and diff again.
+    """
+    await ensure_version_history(project)
+    while True:
+        current = await db.animated_projects.find_one({"id": project["id"]}, {"_id": 0})
+        if current is None:
+            raise HTTPException(status_code=404, detail="Project not found")
+        old_state = version_state(current)
+        new_state = {**old_state, **{field: changes[field] for field in VERSIONED_FIELDS if field in changes}}
+        if not json_diff(old_state, new_state):
+            return current
+        updates = {**changes, "updated_at": datetime.utcnow()}
+        result = await db.animated_projects.update_one(
+            {"id": project["id"], "version": current["version"]},
+            {"$set": updates, "$inc": {"version": 1}}
+        )
+        if result.modified_count:
+            break
+    after = {**current, **updates, "version": current["version"] + 1}
+    await db.project_versions.insert_one(project_version_record(project["id"], after["version"], old_state, new_state))
+    return after
+
+async def load_project_version(project_id: str, version: int) -> Optional[Dict[str, Any]]:
+    snapshots = await db.project_versions.find(
+        {"project_id": project_id, "kind": "snapshot", "version": {"$lte": version}}, {"_id": 0}
+    ).sort("version", -1).limit(1).to_list(1)
+    if not snapshots:
+        return None
+    snapshot = snapshots[0]
+    patches = await db.project_versions.find(
+        {"project_id": project_id, "version": {"$gt": snapshot["version"], "$lte": version}}, {"_id": 0}
+    ).sort("version", 1).to_list(None)
+    if len(patches) != version - snapshot["version"]:
+        return None
+    state = snapshot["state"]
+    for record in patches:
+        state = record["state"] if record["kind"] == "snapshot" else apply_patch(state, record["patch"])
+    return {"version": version, "created_at": (patches[-1] if patches else snapshot)["created_at"], **state}
+
+@api_router.get("/projects/{project_id}/versions")
+async def list_project_versions(project_id: str, limit: int = 50, offset: int = 0):
+    if not await db.animated_projects.find_one({"id": project_id}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Project not found")
+    records = await db.project_versions.find({"project_id": project_id}, {"_id": 0}).sort("version", -1).skip(offset).limit(limit).to_list(None)
+    return [
+        {
+            "version": record["version"],
+            "kind": record["kind"],
+            "created_at": record["created_at"],
+            "changes": len(record["patch"]) if record["kind"] == "diff" else None
+        }
+        for record in records
+    ]
+
+@api_router.get("/projects/{project_id}/versions/{version}")
+async def get_project_version(project_id: str, version: int):
+    state = await load_project_version(project_id, version)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Project version not found")
+    return state
+
+@api_router.post("/projects/{project_id}/versions/{version}/restore", response_model=AnimatedProject)
+async def restore_project_version(project_id: str, version: int):
+    """Make an old version current again; the restore is itself a new version"""
+    project = await db.animated_projects.find_one({"id": project_id}, {"_id": 0})
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    state = await load_project_version(project_id, version)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Project version not found")
+    return AnimatedProject(**await apply_project_changes(project, {field: state[field] for field in VERSIONED_FIELDS}))
+
+# Bulk project operations: one template lookup and one write per request
+BULK_PROJECTS_MAX = int(os.environ.get("BULK_PROJECTS_MAX", "5000"))
+
+def check_bulk_size(count: int):
+    if count > BULK_PROJECTS_MAX:
+        raise HTTPException(status_code=400, detail=f"Bulk request has {count} projects; the limit is {BULK_PROJECTS_MAX}")
+
+@api_router.post("/projects/bulk", response_model=List[AnimatedProject])
+async def create_projects_bulk(bulk_data: BulkProjectCreate):
+    check_bulk_size(len(bulk_data.projects))
+    template = await db.animated_templates.find_one({"id": bulk_data.template_id}, {"_id": 0, "id": 1})
+    if not template:
+        raise HTTPException(status_code=404, detail="Template not found")
+    
+    projects = [AnimatedProject(template_id=bulk_data.template_id, **item.dict()) for item in bulk_data.projects]
+    if projects:
+        await db.animated_projects.insert_many([project.dict() for project in projects])
+        await db.project_versions.insert_many([project_snapshot(project.dict()) for project in projects])
+        await bump_stats({"total_projects": len(projects), f"template_usage.{bulk_data.template_id}": len(projects)})
+    return projects
+
+@api_router.post("/projects/bulk-clone", response_model=List[AnimatedProject])
+async def clone_projects_bulk(clone_data: BulkProjectClone):
+    check_bulk_size(len(clone_data.project_ids) * clone_data.copies)
+    sources = await db.animated_projects.find({"id": {"$in": clone_data.project_ids}}).to_list(None)
+    missing = set(clone_data.project_ids) - {source["id"] for source in sources}
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Projects not found: {sorted(missing)}")
+    
+    clones = [
+        AnimatedProject(
+            template_id=source["template_id"],
+            name=f"{source['name']}{clone_data.name_suffix}" + (f" {n + 1}" if clone_data.copies > 1 else ""),
+            config=source.get("config", {})
+        )
+        for source in sources
+        for n in range(clone_data.copies)
+    ]
+    if clones:
+        await db.animated_projects.insert_many([clone.dict() for clone in clones])
+        await db.project_versions.insert_many([project_snapshot(clone.dict()) for clone in clones])
+        increments = {"total_projects": len(clones)}
+        for clone in clones:
+            key = f"template_usage.{clone.template_id}"
+            increments[key] = increments.get(key, 0) + 1
+        await bump_stats(increments)
+    return clones
+
+@api_router.post("/projects/bulk-delete")
+async def delete_projects_bulk(delete_data: BulkProjectDelete):
+    query = {}
+    if delete_data.ids is not None:
+        query["id"] = {"$in": delete_data.ids}
+    if delete_data.template_id:
+        query["template_id"] = delete_data.template_id
+    if delete_data.name_prefix:
+        query["name"] = {"$regex": f"^{re.escape(delete_data.name_prefix)}"}
+    if not query:
+        raise HTTPException(status_code=400, detail="Provide ids, template_id or name_prefix to select projects")
+    
+    # Per-template counts keep the materialized template usage stats exact
+    matched = await db.animated_projects.find(query, {"_id": 0, "id": 1, "template_id": 1}).to_list(None)
+    ids = [project["id"] for project in matched]
+    result = await db.animated_projects.delete_many({"id": {"$in": ids}})
+    await db.project_versions.delete_many({"project_id": {"$in": ids}})
+    if result.deleted_count:
+        increments = {"total_projects": -result.deleted_count}
+        for project in matched:
+            key = f"template_usage.{project['template_id']}"
+            increments[key] = increments.get(key, 0) - 1
+        await bump_stats(increments)
+    return {"message": "Projects deleted successfully", "deleted_count": result.deleted_count}
+
+# Rendering. Each template type builds a scene for a timestamp: a background
+# colour plus a list of draw operations on a fixed 800x600 design canvas. Scenes
+# are cheap to build and are rasterized with numpy at the requested resolution.
+# Palettes, glyph atlases and background layers are cached so that frames and
+# variants sharing them do not rebuild them.
+DESIGN_WIDTH = 800
+DESIGN_HEIGHT = 600
+QUALITY_FPS = {"low": 15, "medium": 24, "high": 30}
+QUALITY_COMPRESSION = {"low": 1, "medium": 6, "high": 9}
+FFMPEG_BINARY = shutil.which("ffmpeg")
+RAW_EXPORT_MAGIC = b"MGRAW1\n"
+
+# 5x7 bitmap font, one int per row with bit 4 as the leftmost pixel
+GLYPHS = {
+    "0": (0x0E, 0x11, 0x13, 0x15, 0x19, 0x11, 0x0E), "1": (0x04, 0x0C, 0x04, 0x04, 0x04, 0x04, 0x0E),
+    "2": (0x0E, 0x11, 0x01, 0x02, 0x04, 0x08, 0x1F), "3": (0x1F, 0x02, 0x04, 0x02, 0x01, 0x11, 0x0E),
+    "4": (0x02, 0x06, 0x0A, 0x12, 0x1F, 0x02, 0x02), "5": (0x1F, 0x10, 0x1E, 0x01, 0x01, 0x11, 0x0E),
+    "6": (0x06, 0x08, 0x10, 0x1E, 0x11, 0x11, 0x0E), "7": (0x1F, 0x01, 0x02, 0x04, 0x08, 0x08, 0x08),
+    "8": (0x0E, 0x11, 0x11, 0x0E, 0x11, 0x11, 0x0E), "9": (0x0E, 0x11, 0x11, 0x0F, 0x01, 0x02, 0x0C),
+    "A": (0x0E, 0x11, 0x11, 0x11, 0x1F, 0x11, 0x11), "B": (0x1E, 0x11, 0x11, 0x1E, 0x11, 0x11, 0x1E),
+    "C": (0x0E, 0x11, 0x10, 0x10, 0x10, 0x11, 0x0E), "D": (0x1C, 0x12, 0x11, 0x11, 0x11, 0x12, 0x1C),
+    "E": (0x1F, 0x10, 0x10, 0x1E, 0x10, 0x10, 0x1F), "F": (0x1F, 0x10, 0x10, 0x1E, 0x10, 0x10, 0x10),
+    "G": (0x0E, 0x11, 0x10, 0x17, 0x11, 0x11, 0x0F), "H": (0x11, 0x11, 0x11, 0x1F, 0x11, 0x11, 0x11),
+    "I": (0x0E, 0x04, 0x04, 0x04, 0x04, 0x04, 0x0E), "J": (0x07, 0x02, 0x02, 0x02, 0x02, 0x12, 0x0C),
+    "K": (0x11, 0x12, 0x14, 0x18, 0x14, 0x12, 0x11), "L": (0x10, 0x10, 0x10, 0x10, 0x10, 0x10, 0x1F),
+    "M": (0x11, 0x1B, 0x15, 0x15, 0x11, 0x11, 0x11), "N": (0x11, 0x11, 0x19, 0x15, 0x13, 0x11, 0x11),
+    "O": (0x0E, 0x11, 0x11, 0x11, 0x11, 0x11, 0x0E), "P": (0x1E, 0x11, 0x11, 0x1E, 0x10, 0x10, 0x10),
+    "Q": (0x0E, 0x11, 0x11, 0x11, 0x15, 0x12, 0x0D), "R": (0x1E, 0x11, 0x11, 0x1E, 0x14, 0x12, 0x11),
+    "S": (0x0F, 0x10, 0x10, 0x0E, 0x01, 0x01, 0x1E), "T": (0x1F, 0x04, 0x04, 0x04, 0x04, 0x04, 0x04),
+    "U": (0x11, 0x11, 0x11, 0x11, 0x11, 0x11, 0x0E), "V": (0x11, 0x11, 0x11, 0x11, 0x11, 0x0A, 0x04),
+    "W": (0x11, 0x11, 0x11, 0x15, 0x15, 0x15, 0x0A), "X": (0x11, 0x11, 0x0A, 0x04, 0x0A, 0x11, 0x11),
+    "Y": (0x11, 0x11, 0x11, 0x0A, 0x04, 0x04, 0x04), "Z": (0x1F, 0x01, 0x02, 0x04, 0x08, 0x10, 0x1F),
+    " ": (0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00), ".": (0x00, 0x00, 0x00, 0x00, 0x00, 0x0C, 0x0C),
+    ",": (0x00, 0x00, 0x00, 0x00, 0x0C, 0x04, 0x08), ":": (0x00, 0x0C, 0x0C, 0x00, 0x0C, 0x0C, 0x00),
+    "%": (0x18, 0x19, 0x02, 0x04, 0x08, 0x13, 0x03), "$": (0x04, 0x0F, 0x14, 0x0E, 0x05, 0x1E, 0x04),
+    "-": (0x00, 0x00, 0x00, 0x1F, 0x00, 0x00, 0x00), "+": (0x00, 0x04, 0x04, 0x1F, 0x04, 0x04, 0x00),
+    "!": (0x04, 0x04, 0x04, 0x04, 0x04, 0x00, 0x04), "?": (0x0E, 0x11, 0x01, 0x02, 0x04, 0x00, 0x04),
+    "/": (0x00, 0x01, 0x02, 0x04, 0x08, 0x10, 0x00), "'": (0x04, 0x04, 0x08, 0x00, 0x00, 0x00, 0x00)
+}
+
+PLATFORM_COLORS = {
+    "instagram": "#e4405f",
+    "youtube": "#ff0000",
+    "twitter": "#1da1f2",
+    "tiktok": "#69c9d0",
+    "linkedin": "#0a66c2"
+}
+
+@functools.lru_cache(maxsize=1024)
+def hex_to_rgb(color: str) -> Tuple[int, int, int]:
+    color = str(color).lstrip("#")
+    if len(color) == 3:
+        color = "".join(c * 2 for c in color)
+    try:
+        return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+    except ValueError:
+        return (255, 255, 255)
+
+@functools.lru_cache(maxsize=64)
+def glyph_atlas(scale: int) -> Dict[str, "np.ndarray"]:
+    """Boolean glyph masks for one pixel scale, shared by every frame drawn at that size"""
+    block = np.ones((scale, scale), dtype=bool)
+    atlas = {}
+    for char, rows in GLYPHS.items():
+        bits = np.array([[(row >> (4 - col)) & 1 for col in range(5)] for row in rows], dtype=bool)
+        atlas[char] = np.kron(bits, block)
+    return atlas
+
+@functools.lru_cache(maxsize=32)
+def background_layer(width: int, height: int, color: Tuple[int, int, int]) -> "np.ndarray":
+    layer = np.empty((height, width, 3), dtype=np.uint8)
+    layer[:, :] = color
+    layer.flags.writeable = False
+    return layer
+
+def ease(progress: float, easing: str = "ease-out") -> float:
+    p = min(1.0, max(0.0, progress))
+    if easing == "linear":
+        return p
+    if easing == "ease-in":
+        return p * p
+    if easing == "ease-in-out":
+        return 2 * p * p if p < 0.5 else 1 - (-2 * p + 2) ** 2 / 2
+    if easing == "bounce":
+        if p < 1 / 2.75:
+            return 7.5625 * p * p
+        if p < 2 / 2.75:
+            p -= 1.5 / 2.75
+            return 7.5625 * p * p + 0.75
+        if p < 2.5 / 2.75:
+            p -= 2.25 / 2.75
+            return 7.5625 * p * p + 0.9375
+        p -= 2.625 / 2.75
+        return 7.5625 * p * p + 0.984375
+    return 1 - (1 - p) * (1 - p)
+
+def text_op(text: str, x: float, y: float, size: float, color: str, alpha: float = 1.0, spacing: float = 0) -> Dict[str, Any]:
+    return {"op": "text", "text": text, "x": x, "y": y, "size": size, "color": color, "alpha": alpha, "spacing": spacing}
+
+def rect_op(x: float, y: float, width: float, height: float, color: str, alpha: float = 1.0) -> Dict[str, Any]:
+    return {"op": "rect", "x": x, "y": y, "width": width, "height": height, "color": color, "alpha": alpha}
+
+def circle_op(x: float, y: float, radius: float, color: str, alpha: float = 1.0) -> Dict[str, Any]:
+    return {"op": "circle", "x": x, "y": y, "radius": radius, "color": color, "alpha": alpha}
+
+def particle_vectors(count: int, seed: int = 7) -> List[Tuple[float, float]]:
+    rng = random.Random(seed)
+    return [(rng.uniform(0, 2 * math.pi), rng.uniform(0.4, 1.0)) for _ in range(count)]
+
+def counter_scene(config: Dict[str, Any], t: float) -> List[Dict[str, Any]]:
+    p = ease(t / max(1, config.get("duration", 3000)), config.get("easing", "ease-out"))
+    start, end = config.get("start_value", 0), config.get("end_value", 0)
+    decimals = int(config.get("decimal_places", 0))
+    text = f"{config.get('currency', '')}{start + (end - start) * p:,.{decimals}f}"
+    size, color = config.get("font_size", 48), config.get("color", "#ffffff")
+    ops = []
+    if config.get("glow_effect"):
+        ops.append(text_op(text, 400, 300, size * 1.08, color, 0.3))
+    ops.append(text_op(text, 400, 300, size, color))
+    return ops
+
+def chart_scene(config: Dict[str, Any], t: float) -> List[Dict[str, Any]]:
+    data = config.get("data") or []
+    p = ease(t / max(1, config.get("duration", 2000)))
+    bar_width, spacing = config.get("bar_width", 40), config.get("spacing", 20)
+    text_color = config.get("text_color", "#ffffff")
+    max_value = max([abs(bar.get("value", 0)) for bar in data] + [1])
+    x = 400 - (len(data) * bar_width + max(0, len(data) - 1) * spacing) / 2
+    ops = []
+    for bar in data:
+        value = bar.get("value", 0)
+        grown = p if config.get("animate_bars", True) else 1.0
+        height = 300 * abs(value) / max_value * grown
+        ops.append(rect_op(x, 450 - height, bar_width, height, bar.get("color", "#8b5cf6")))
+        label_alpha = p if config.get("animate_labels", True) else 1.0
+        ops.append(text_op(str(bar.get("label", "")), x + bar_width / 2, 475, 16, text_color, label_alpha))
+        if config.get("show_values", True):
+            ops.append(text_op(str(round(value * grown)), x + bar_width / 2, 435 - height, 14, text_color))
+        x += bar_width + spacing
+    return ops
+
+def social_counter_scene(config: Dict[str, Any], t: float) -> List[Dict[str, Any]]:
+    p = ease(t / max(1, config.get("duration", 4000)))
+    start, end = config.get("start_count", 0), config.get("end_count", 0)
+    size, color = config.get("font_size", 32), config.get("color", "#ffffff")
+    ops = []
+    if config.get("show_icon", True):
+        pulse = 1 + 0.1 * math.sin(2 * math.pi * t / 1000) if config.get("animate_icon") else 1
+        ops.append(circle_op(400, 220, 30 * pulse, PLATFORM_COLORS.get(config.get("platform"), color)))
+    ops.append(text_op(f"{round(start + (end - start) * p):,}", 400, 310, size, color))
+    ops.append(text_op(str(config.get("label", "")), 400, 360, size * 0.5, color, 0.8))
+    return ops
+
+def countdown_scene(config: Dict[str, Any], t: float) -> List[Dict[str, Any]]:
+    unit_seconds = {"seconds": 1, "minutes": 60, "hours": 3600}.get(config.get("time_unit"), 1)
+    remaining = max(0, math.ceil(config.get("start_time", 60) * unit_seconds - t / 1000))
+    hours, rest = divmod(remaining, 3600)
+    minutes, seconds = divmod(rest, 60)
+    text = f"{hours:02d}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+    warning = remaining <= config.get("warning_threshold", 10)
+    color = config.get("warning_color", "#ff3333") if warning else config.get("color", "#ffffff")
+    size = config.get("font_size", 48)
+    ops = [text_op(text, 400, 300, size, color)]
+    if config.get("show_labels", True):
+        ops.append(text_op("HRS MIN SEC" if hours else "MIN SEC", 400, 300 + size * 0.9, size * 0.3, color, 0.7))
+    return ops
+
+def text_animation_scene(config: Dict[str, Any], t: float) -> List[Dict[str, Any]]:
+    text = str(config.get("text", ""))
+    p = ease((t - config.get("delay", 0)) / max(1, config.get("duration", 2000)))
+    size, color = config.get("font_size", 36), config.get("color", "#ffffff")
+    spacing = config.get("letter_spacing", 0)
+    x, y, alpha = 400.0, 300.0, p
+    animation = config.get("animation_type", "typewriter")
+    if animation == "typewriter":
+        text, alpha = text[:round(len(text) * p)], 1.0
+    elif animation == "slide_up":
+        y += 50 * (1 - p)
+    elif animation == "bounce":
+        y -= 40 * abs(math.sin(math.pi * p * 3)) * (1 - p)
+    elif animation == "wave":
+        y += 10 * math.sin(2 * math.pi * t / 1000)
+    elif animation == "glitch":
+        x += random.Random(int(t // 50)).uniform(-8, 8) * (1 - p)
+    ops = []
+    if config.get("glow_intensity"):
+        ops.append(text_op(text, x, y, size * 1.08, color, alpha * min(1.0, config["glow_intensity"] / 20), spacing))
+    ops.append(text_op(text, x, y, size, color, alpha, spacing))
+    return ops
+
+def logo_reveal_scene(config: Dict[str, Any], t: float) -> List[Dict[str, Any]]:
+    p = ease(t / max(1, config.get("duration", 3000)))
+    size, color = config.get("font_size", 48), config.get("color", "#ffffff")
+    reveal = config.get("reveal_type", "fade_in")
+    x = 400 + config.get("shake_intensity", 0) * math.sin(t / 20) * (1 - p)
+    alpha = p
+    if reveal == "scale_up":
+        size *= max(0.05, p)
+    elif reveal == "slide_reveal":
+        x -= 300 * (1 - p)
+    ops = []
+    if reveal == "particle_burst":
+        for angle, speed in particle_vectors(int(config.get("particle_count", 30))):
+            distance = 250 * speed * p
+            ops.append(circle_op(400 + math.cos(angle) * distance, 300 + math.sin(angle) * distance, 3, color, 1 - p))
+    if config.get("glow_effect"):
+        ops.append(text_op(str(config.get("logo_text", "")), x, 300, size * 1.08, color, 0.3 * alpha))
+    ops.append(text_op(str(config.get("logo_text", "")), x, 300, size, color, alpha))
+    return ops
+
+def progress_bar_scene(config: Dict[str, Any], t: float) -> List[Dict[str, Any]]:
+    p = ease(t / max(1, config.get("duration", 2000)))
+    progress = config.get("progress", 0) * p
+    height = config.get("height", 20)
+    alpha = 0.75 + 0.25 * math.cos(2 * math.pi * t / 1000) if config.get("pulse_effect") else 1.0
+    ops = [
+        rect_op(150, 300 - height / 2, 500, height, config.get("background_color", "#374151")),
+        rect_op(150, 300 - height / 2, 5 * progress, height, config.get("bar_color", "#8b5cf6"), alpha)
+    ]
+    if config.get("gradient_effect"):
+        ops.append(rect_op(150, 300 - height / 2, 5 * progress, height / 2, "#ffffff", 0.2))
+    if config.get("show_percentage", True):
+        ops.append(text_op(f"{round(progress)}%", 400, 300 - height - 20, 20, config.get("text_color", "#ffffff")))
+    return ops
+
+def particles_scene(config: Dict[str, Any], t: float) -> List[Dict[str, Any]]:
+    duration = max(1, config.get("duration", 3000))
+    elapsed = max(0.0, t - config.get("trigger_delay", 0))
+    p = min(1.0, elapsed / duration)
+    size, color = config.get("particle_size", 4), config.get("particle_color", "#ffffff")
+    spread, gravity = config.get("spread", 200), config.get("gravity", 0.5)
+    square = config.get("particle_shape", "circle") != "circle"
+    ops = []
+    for angle, speed in particle_vectors(int(config.get("particle_count", 50))):
+        steps = [p, max(0.0, p - 0.05)] if config.get("trail_effect") else [p]
+        for i, step in enumerate(steps):
+            x = 400 + math.cos(angle) * spread * speed * step
+            y = 300 + math.sin(angle) * spread * speed * step + gravity * 200 * step * step
+            alpha = (1 - p) * (0.3 if i else 1.0)
+            ops.append(rect_op(x - size / 2, y - size / 2, size, size, color, alpha) if square else circle_op(x, y, size / 2, color, alpha))
+    return ops
+
+def loading_scene(config: Dict[str, Any], t: float) -> List[Dict[str, Any]]:
+    color, size = config.get("color", "#8b5cf6"), config.get("size", 60)
+    phase = t / 1000 * config.get("speed", 1.5)
+    stroke = config.get("stroke_width", 4)
+    loading_type = config.get("loading_type", "spinner")
+    ops = []
+    if loading_type in ("spinner", "orbit"):
+        active = int(phase * 8) % 8
+        for i in range(8):
+            angle = 2 * math.pi * i / 8 + (phase * 2 * math.pi if loading_type == "orbit" else 0)
+            alpha = 1.0 if i == active else 0.3
+            ops.append(circle_op(400 + math.cos(angle) * size / 2, 300 + math.sin(angle) * size / 2, stroke, color, alpha))
+    elif loading_type == "pulse":
+        ops.append(circle_op(400, 300, size / 2 * (0.6 + 0.4 * abs(math.sin(math.pi * phase))), color))
+    else:
+        count = 3 if loading_type == "dots" else 5
+        for i in range(count):
+            offset = math.sin(2 * math.pi * (phase - i / count))
+            x = 400 + (i - (count - 1) / 2) * stroke * 4
+            if loading_type == "dots":
+                ops.append(circle_op(x, 300 - offset * size / 4, stroke * 1.5, color))
+            else:
+                bar_height = size / 2 * (0.6 + 0.4 * offset)
+                ops.append(rect_op(x - stroke, 300 - bar_height / 2, stroke * 2, bar_height, color))
+    if config.get("show_text", True):
+        ops.append(text_op(str(config.get("loading_text", "")), 400, 300 + size / 2 + 30, 16, config.get("text_color", "#ffffff")))
+    return ops
+
+SCENE_BUILDERS = {
+    "counter": counter_scene,
+    "chart": chart_scene,
+    "social_counter": social_counter_scene,
+    "countdown": countdown_scene,
+    "text_animation": text_animation_scene,
+    "logo_reveal": logo_reveal_scene,
+    "progress_bar": progress_bar_scene,
+    "particles": particles_scene,
+    "loading": loading_scene
+}
+
+def build_scene(template_type: str, config: Dict[str, Any], t: float) -> Dict[str, Any]:
+    builder = SCENE_BUILDERS.get(template_type)
+    ops = builder(config, t) if builder else []
+    return {"background": config.get("background", "#000000"), "ops": ops}
+
+def blend(region: "np.ndarray", mask: "np.ndarray", color: Tuple[int, int, int], alpha: float):
+    if alpha <= 0:
+        return
+    if alpha >= 1:
+        region[mask] = color
+    else:
+        region[mask] = (region[mask] * (1 - alpha) + np.array(color) * alpha).astype(np.uint8)
+
+def rasterize(scene: Dict[str, Any], width: int, height: int) -> "np.ndarray":
+    """Draw a scene into an RGB frame of the requested size"""
+    frame = background_layer(width, height, hex_to_rgb(scene["background"])).copy()
+    sx, sy = width / DESIGN_WIDTH, height / DESIGN_HEIGHT
+    for op in scene["ops"]:
+        color = hex_to_rgb(op["color"])
+        alpha = op.get("alpha", 1.0)
+        if op["op"] == "rect":
+            x0, y0 = max(0, int(op["x"] * sx)), max(0, int(op["y"] * sy))
+            x1, y1 = min(width, int((op["x"] + op["width"]) * sx)), min(height, int((op["y"] + op["height"]) * sy))
+            if x1 > x0 and y1 > y0:
+                region = frame[y0:y1, x0:x1]
+                blend(region, np.ones(region.shape[:2], dtype=bool), color, alpha)
+        elif op["op"] == "circle":
+            cx, cy, r = op["x"] * sx, op["y"] * sy, max(0.5, op["radius"] * min(sx, sy))
+            x0, y0 = max(0, int(cx - r)), max(0, int(cy - r))
+            x1, y1 = min(width, int(cx + r) + 1), min(height, int(cy + r) + 1)
+            if x1 > x0 and y1 > y0:
+                ys, xs = np.ogrid[y0:y1, x0:x1]
+                blend(frame[y0:y1, x0:x1], (xs - cx) ** 2 + (ys - cy) ** 2 <= r * r, color, alpha)
+        elif op["op"] == "text":
+            draw_text(frame, op, sx, sy, color, alpha)
+    return frame
+
+def draw_text(frame: "np.ndarray", op: Dict[str, Any], sx: float, sy: float, color: Tuple[int, int, int], alpha: float):
+    text = op["text"].upper()
+    if not text or alpha <= 0:
+        return
+    scale = max(1, round(op["size"] * min(sx, sy) / 10))
+    atlas = glyph_atlas(scale)
+    advance = 6 * scale + int(op.get("spacing", 0) * min(sx, sy))
+    text_width = advance * len(text) - scale
+    x = int(op["x"] * sx - text_width / 2)
+    y = int(op["y"] * sy - 7 * scale / 2)
+    height, width = frame.shape[:2]
+    for char in text:
+        mask = atlas.get(char, atlas["?"])
+        gx0, gy0 = max(0, x), max(0, y)
+        gx1, gy1 = min(width, x + mask.shape[1]), min(height, y + mask.shape[0])
+        if gx1 > gx0 and gy1 > gy0:
+            blend(frame[gy0:gy1, gx0:gx1], mask[gy0 - y:gy1 - y, gx0 - x:gx1 - x], color, alpha)
+        x += advance
+
+def frame_times(duration_ms: int, fps: int) -> List[float]:
+    count = max(1, math.ceil(duration_ms / 1000 * fps))
+    return [i * 1000 / fps for i in range(count)]
+
+def encode_frames(frames, path: Path, fmt: str, width: int, height: int, fps: int, quality: str, header: Dict[str, Any]) -> int:
+    """Encode RGB frames into ``path`` and return the number of frames written.
+
+    Uses ffmpeg when it is installed. Without it, frames are written as a raw
+    container: a magic line, a JSON header line, then length-prefixed
+    zlib-compressed rgb24 frames. Callers pick the file name and reported
+    format through ``export_output_format`` so raw files are never labelled
+    as video.
+    """
+    count = 0
+    if FFMPEG_BINARY:
+        codec_args = {
+            "mp4": ["-c:v", "libx264", "-pix_fmt", "yuv420p", "-crf", {"low": "32", "medium": "26", "high": "20"}.get(quality, "23")],
+            "webm": ["-c:v", "libvpx-vp9", "-b:v", "0", "-crf", {"low": "45", "medium": "36", "high": "30"}.get(quality, "36")],
+            "gif": []
+        }.get(fmt, [])
+        process = subprocess.Popen(
+            [FFMPEG_BINARY, "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "rgb24",
+             "-s", f"{width}x{height}", "-r", str(fps), "-i", "-", *codec_args, "-f", fmt, str(path)],
+            stdin=subprocess.PIPE
+        )
+        try:
+            for frame in frames:
+                process.stdin.write(frame.tobytes())
+                count += 1
+        finally:
+            process.stdin.close()
+            if process.wait() != 0:
+                raise RuntimeError(f"ffmpeg exited with status {process.returncode}")
+        return count
+
+    with open(path, "wb") as f:
+        write_raw_header(f, header, width, height, fps)
+        return write_raw_frames(f, frames, quality)
+
+def write_raw_header(f, header: Dict[str, Any], width: int, height: int, fps: int):
+    f.write(RAW_EXPORT_MAGIC)
+    f.write(json.dumps({**header, "width": width, "height": height, "fps": fps, "pix_fmt": "rgb24"}, default=str).encode() + b"\n")
+
+def write_raw_frames(f, frames, quality: str) -> int:
+    level = QUALITY_COMPRESSION.get(quality, 6)
+    count = 0
+    for frame in frames:
+        data = zlib.compress(frame.tobytes(), level)
+        f.write(struct.pack(">I", len(data)))
+        f.write(data)
+        count += 1
+    return count
+
+def encode_segment(frames, path: Path, fmt: str, width: int, height: int, fps: int, quality: str) -> int:
+    """Encode one slice of an export; ``join_segments`` turns the slices into the final file"""
+    if FFMPEG_BINARY:
+        return encode_frames(frames, path, fmt, width, height, fps, quality, {})
+    # Raw segments hold only frame records so joining is a plain concatenation
+    with open(path, "wb") as f:
+        return write_raw_frames(f, frames, quality)
+
+def join_segments(segments: List[Path], path: Path, fmt: str, width: int, height: int, fps: int, header: Dict[str, Any]):
+    if FFMPEG_BINARY:
+        listing = path.with_name(path.name + ".segments.txt")
+        listing.write_text("".join(f"file '{segment}'\n" for segment in segments))
+        # Video segments share codec settings and are stream-copied; GIF palettes are rebuilt
+        codec_args = [] if fmt == "gif" else ["-c", "copy"]
+        try:
+            subprocess.run(
+                [FFMPEG_BINARY, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", str(listing), *codec_args, "-f", fmt, str(path)],
+                check=True
+            )
+        finally:
+            listing.unlink(missing_ok=True)
+        return
+    with open(path, "wb") as f:
+        write_raw_header(f, header, width, height, fps)
+        for segment in segments:
+            with open(segment, "rb") as part:
+                shutil.copyfileobj(part, f)
+
+class FrameCache:
+    """LRU of rasterized frames keyed by scene digest.
+
+    Variants of one project often produce identical frames (the first frame of
+    every counter, static backgrounds, finished bars), so a batch shares one cache.
+    """
+
+    def __init__(self, max_frames: int):
+        self.max_frames = max_frames
+        self.frames: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def render(self, scene: Dict[str, Any], width: int, height: int, tally: Optional[Dict[str, int]] = None) -> "np.ndarray":
+        """Return the cached frame for ``scene``, rasterizing it on a miss.
+
+        ``tally`` collects per-call hit/miss counts, since the shared counters
+        mix concurrent callers.
+        """
+        key = hashlib.sha1(json.dumps([scene, width, height], sort_keys=True).encode()).hexdigest()
+        with self.lock:
+            frame = self.frames.get(key)
+            if frame is not None:
+                self.frames.move_to_end(key)
+                self.hits += 1
+                if tally is not None:
+                    tally["hits"] = tally.get("hits", 0) + 1
+                return frame
+            self.misses += 1
+        if tally is not None:
+            tally["misses"] = tally.get("misses", 0) + 1
+        frame = rasterize(scene, width, height)
+        frame.flags.writeable = False
+        with self.lock:
+            self.frames[key] = frame
+            if len(self.frames) > self.max_frames:
+                self.frames.popitem(last=False)
+        return frame
+
+# Vector export: the scene is sampled on the export frame grid and each op
+# becomes a layer whose properties are keyframed. Numeric properties are
+# linearly interpolated by the player, so samples a straight line already
+# predicts are dropped; text and colors are hold keyframes at change points.
+VECTOR_FORMAT = "vector"
+VECTOR_FORMAT_VERSION = 1
+VECTOR_TOLERANCES = {"alpha": 0.004}
+VECTOR_DEFAULT_TOLERANCE = 0.25  # design-space pixels
+EXPORT_EXTENSIONS = {VECTOR_FORMAT: "json"}
+
+def linear_keyframes(times: List[float], values: List[float], tolerance: float) -> List[List[float]]:
+    """Greedily keep the fewest samples whose linear interpolation stays within ``tolerance``.
+
+    Every sample between the last kept keyframe and the candidate bounds the
+    slope the segment may have, so the window of allowed slopes is narrowed
+    incrementally and the whole pass stays linear in the number of samples.
+    """
+    kept = [0]
+    anchor = 0
+    low, high = -math.inf, math.inf
+    for end in range(1, len(values)):
+        slope = (values[end] - values[anchor]) / (times[end] - times[anchor])
+        if not low <= slope <= high:
+            anchor = end - 1
+            kept.append(anchor)
+            low, high = -math.inf, math.inf
+        elapsed = times[end] - times[anchor]
+        low = max(low, (values[end] - tolerance - values[anchor]) / elapsed)
+        high = min(high, (values[end] + tolerance - values[anchor]) / elapsed)
+    if len(values) > 1:
+        kept.append(len(values) - 1)
+    return [[times[i], round(values[i], 3)] for i in kept]
+
+def hold_keyframes(times: List[float], values: List[Any]) -> List[List[Any]]:
+    return [[times[i], value] for i, value in enumerate(values) if i == 0 or value != values[i - 1]]
+
+def compile_vector_animation(template_type: str, config: Dict[str, Any], width: int, height: int, duration_ms: int, fps: int) -> Dict[str, Any]:
+    """Compile a project into keyframed layers a player can interpolate at any size.
+
+    Coordinates are in the 800x600 design space the scene builders use; players
+    scale them (and text size by the smaller axis) to the target size.
+    """
+    times = frame_times(duration_ms, fps)
+    scenes = [build_scene(template_type, config, t) for t in times]
+    layers = []
+    # Scene builders emit the same ops in the same order for every t
+    for index, first in enumerate(scenes[0]["ops"]):
+        layer = {"type": first["op"], "static": {}, "keyframes": {}}
+        for prop in first:
+            if prop == "op":
+                continue
+            samples = [scene["ops"][index][prop] for scene in scenes]
+            if all(sample == samples[0] for sample in samples):
+                layer["static"][prop] = samples[0]
+            elif isinstance(samples[0], (int, float)):
+                tolerance = VECTOR_TOLERANCES.get(prop, VECTOR_DEFAULT_TOLERANCE)
+                layer["keyframes"][prop] = {"interpolation": "linear", "values": linear_keyframes(times, samples, tolerance)}
+            else:
+                layer["keyframes"][prop] = {"interpolation": "hold", "values": hold_keyframes(times, samples)}
+        layers.append(layer)
+    return {
+        "format": "motionstock-vector",
+        "version": VECTOR_FORMAT_VERSION,
+        "design_size": [DESIGN_WIDTH, DESIGN_HEIGHT],
+        "size": [width, height],
+        "fps": fps,
+        "duration": duration_ms,
+        "background": scenes[0]["background"],
+        "layers": layers
+    }
+
+def render_animation(template_type: str, config: Dict[str, Any], path: Path, fmt: str, width: int, height: int, duration_ms: int, quality: str, header: Dict[str, Any], frame_cache: Optional[FrameCache] = None) -> int:
+    fps = QUALITY_FPS.get(quality, 30)
+    if fmt == VECTOR_FORMAT:
+        animation = compile_vector_animation(template_type, config, width, height, duration_ms, fps)
+        with open(path, "w") as f:
+            json.dump({**animation, "meta": header}, f, separators=(",", ":"), default=str)
+        return len(frame_times(duration_ms, fps))
+    draw = frame_cache.render if frame_cache else rasterize
+    frames = (draw(build_scene(template_type, config, t), width, height) for t in frame_times(duration_ms, fps))
+    return encode_frames(frames, path, fmt, width, height, fps, quality, header)
+
+# Render scheduling. Every render runs on a fixed worker pool behind a
+# scheduler with strict priority between classes and round-robin between
+# clients inside a class, so one client's 500-variant batch is interleaved
+# with everyone else's work instead of running ahead of it. Workers are not
+# preempted; instead RENDER_INTERACTIVE_RESERVED workers only ever take
+# interactive jobs so previews never wait behind a long export.
+RENDER_CLASSES = ("interactive", "export", "batch")  # highest priority first
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", str(max(2, os.cpu_count() or 1))))
+RENDER_INTERACTIVE_RESERVED = int(os.environ.get("RENDER_INTERACTIVE_RESERVED", "1"))
+RENDER_WAIT_SAMPLES = 500
+
+def render_client(request: Request) -> str:
+    """Fair-queuing key: an explicit client id, else the caller's address"""
+    return request.headers.get("x-client-id") or (request.client.host if request.client else "anonymous")
+
+class RenderScheduler:
+    def __init__(self, workers: int, interactive_reserved: int):
+        self.workers = workers
+        # Always leave at least one worker for exports and batches
+        self.interactive_reserved = min(interactive_reserved, workers - 1)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render")
+        # Per class: client -> queued jobs, in round-robin order
+        self.queues: Dict[str, "OrderedDict[str, deque]"] = {name: OrderedDict() for name in RENDER_CLASSES}
+        self.running = {name: 0 for name in RENDER_CLASSES}
+        self.completed = {name: 0 for name in RENDER_CLASSES}
+        self.waits = {name: deque(maxlen=RENDER_WAIT_SAMPLES) for name in RENDER_CLASSES}
+
+    async def run(self, priority: str, client_id: str, fn, *args):
+        """Queue ``fn(*args)`` for a render worker and wait for its result"""
+        if priority not in self.queues:
+            raise ValueError(f"Unknown render priority: {priority}")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.queues[priority].setdefault(client_id, deque()).append((future, fn, args, time.perf_counter()))
+        RENDER_QUEUE_DEPTH.inc(priority=priority)
+        self.dispatch(loop)
+        return await future
+
+    def next_job(self):
+        busy = sum(self.running.values())
+        for priority in RENDER_CLASSES:
+            if priority != "interactive" and busy - self.running["interactive"] >= self.workers - self.interactive_reserved:
+                continue
+            clients = self.queues[priority]
+            while clients:
+                client_id, jobs = next(iter(clients.items()))
+                job = jobs.popleft()
+                if jobs:
+                    clients.move_to_end(client_id)
+                else:
+                    del clients[client_id]
+                RENDER_QUEUE_DEPTH.dec(priority=priority)
+                # Requests that went away while queued are dropped here
+                if not job[0].cancelled():
+                    return priority, job
+        return None
+
+    def dispatch(self, loop):
+        while sum(self.running.values()) < self.workers:
+            picked = self.next_job()
+            if picked is None:
+                return
+            priority, (future, fn, args, queued_at) = picked
+            wait = time.perf_counter() - queued_at
+            self.waits[priority].append(wait)
+            RENDER_QUEUE_WAIT.observe(wait, priority=priority)
+            self.running[priority] += 1
+            work = loop.run_in_executor(self.executor, fn, *args)
+            work.add_done_callback(functools.partial(self.finished, loop, priority, future))
+
+    def finished(self, loop, priority: str, future, work):
+        self.running[priority] -= 1
+        self.completed[priority] += 1
+        if not future.done():
+            if work.cancelled():
+                future.cancel()
+            elif work.exception() is not None:
+                future.set_exception(work.exception())
+            else:
+                future.set_result(work.result())
+        self.dispatch(loop)
+
+    def stats(self) -> Dict[str, Any]:
+        classes = {}
+        for priority in RENDER_CLASSES:
+            waits = sorted(self.waits[priority])
+            classes[priority] = {
+                "queued": sum(len(jobs) for jobs in self.queues[priority].values()),
+                "running": self.running[priority],
+                "completed": self.completed[priority],
+                "waiting_clients": len(self.queues[priority]),
+                "wait_p50_ms": round(waits[len(waits) // 2] * 1000, 3) if waits else None,
+                "wait_p95_ms": round(waits[int(len(waits) * 0.95)] * 1000, 3) if waits else None,
+                "wait_max_ms": round(waits[-1] * 1000, 3) if waits else None
+            }
+        return {"workers": self.workers, "interactive_reserved": self.interactive_reserved, "classes": classes}
+
+render_scheduler = RenderScheduler(RENDER_WORKERS, RENDER_INTERACTIVE_RESERVED)
+
+@api_router.get("/render-queue")
+async def render_queue_stats():
+    return render_scheduler.stats()
+
 # Export functionality
+BATCH_EXPORT_MAX_VARIANTS = int(os.environ.get("BATCH_EXPORT_MAX_VARIANTS", "1000"))
+BATCH_FRAME_CACHE_FRAMES = int(os.environ.get("BATCH_FRAME_CACHE_FRAMES", "512"))
+
+RAW_EXPORT_FORMAT = "mgraw"
+
+def export_output_format(fmt: str) -> str:
+    """The format actually written for a requested one; video falls back to raw without ffmpeg"""
+    if fmt == VECTOR_FORMAT or FFMPEG_BINARY:
+        return fmt
+    return RAW_EXPORT_FORMAT
+
+def export_file_name(project_name: str, fmt: str, suffix: str = "") -> str:
+    return f"{project_name.replace(' ', '_')}{suffix}_{uuid.uuid4().hex[:8]}.{EXPORT_EXTENSIONS.get(fmt, fmt)}"
+
+def batch_variant_count(batch: "BatchExportRequest") -> int:
+    """Size of the expansion, checked before anything is expanded"""
+    empty = [key for key, values in batch.sweep.items() if not values]
+    if empty:
+        raise HTTPException(status_code=422, detail=f"Sweep values must not be empty: {empty}")
+    return len(batch.overrides or [{}]) * math.prod(len(values) for values in batch.sweep.values())
+
+def batch_variants(batch: "BatchExportRequest") -> List[Dict[str, Any]]:
+    """Expand explicit overrides and a cartesian sweep into per-variant config overrides"""
+    overrides = batch.overrides or [{}]
+    sweep_keys = list(batch.sweep)
+    sweep = [dict(zip(sweep_keys, values)) for values in itertools.product(*batch.sweep.values())] or [{}]
+    return [{**override, **point} for override in overrides for point in sweep]
+
+# Export artifact lifecycle. Every finished export is tracked in
+# export_artifacts with its size and last download; a background sweep expires
+# idle artifacts and evicts the least recently used ones over the disk quota.
+# Renders write to a .part file that is renamed into place once complete, so a
+# crash never leaves a truncated file under a downloadable name.
+EXPORT_TTL_SECONDS = int(os.environ.get("EXPORT_TTL_SECONDS", "86400"))  # 0 disables expiry
+EXPORT_DISK_QUOTA_BYTES = int(os.environ.get("EXPORT_DISK_QUOTA_BYTES", str(10 * 1024 ** 3)))  # 0 disables the quota
+EXPORT_SWEEP_INTERVAL = int(os.environ.get("EXPORT_SWEEP_INTERVAL", "300"))  # seconds, 0 disables
+EXPORT_ORPHAN_GRACE_SECONDS = 3600  # leaves files another worker may still be finishing
+PARTIAL_SUFFIX = ".part"
+
+def partial_path(path: Path) -> Path:
+    return path.with_name(path.name + PARTIAL_SUFFIX)
+
+def write_atomically(path: Path, write):
+    """Call ``write`` with a temporary path and move the result to ``path`` once it succeeds"""
+    partial = partial_path(path)
+    try:
+        result = write(partial)
+        os.replace(partial, path)
+        return result
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+
+def export_artifact(path: Path, **fields) -> Dict[str, Any]:
+    now = datetime.utcnow()
+    return {"id": path.name, "size": path.stat().st_size, "created_at": now, "last_accessed_at": now, **fields}
+
+def remove_export_files(names: List[str]):
+    for name in names:
+        (EXPORTS_DIR / name).unlink(missing_ok=True)
+
+async def delete_export_artifacts(artifacts: List[Dict[str, Any]]) -> int:
+    """Remove artifact files and their records; returns the bytes freed"""
+    if not artifacts:
+        return 0
+    names = [artifact["id"] for artifact in artifacts]
+    await asyncio.to_thread(remove_export_files, names)
+    await db.export_artifacts.delete_many({"id": {"$in": names}})
+    return sum(artifact.get("size", 0) for artifact in artifacts)
+
+async def export_disk_usage() -> int:
+    totals = await db.export_artifacts.aggregate([{"$group": {"_id": None, "size": {"$sum": "$size"}}}]).to_list(1)
+    return totals[0]["size"] if totals else 0
+
+async def sweep_export_artifacts() -> Dict[str, int]:
+    """Expire artifacts idle past the TTL, then evict least recently used ones over the quota"""
+    expired, evicted, freed = [], [], 0
+    if EXPORT_TTL_SECONDS > 0:
+        cutoff = datetime.utcnow() - timedelta(seconds=EXPORT_TTL_SECONDS)
+        expired = await db.export_artifacts.find({"last_accessed_at": {"$lt": cutoff}}, {"_id": 0, "id": 1, "size": 1}).to_list(None)
+        freed += await delete_export_artifacts(expired)
+
+    total = await export_disk_usage()
+    if EXPORT_DISK_QUOTA_BYTES > 0 and total > EXPORT_DISK_QUOTA_BYTES:
+        excess = total - EXPORT_DISK_QUOTA_BYTES
+        cursor = db.export_artifacts.find({}, {"_id": 0, "id": 1, "size": 1}).sort("last_accessed_at", 1)
+        async for artifact in cursor:
+            evicted.append(artifact)
+            excess -= artifact.get("size", 0)
+            if excess <= 0:
+                break
+        evicted_bytes = await delete_export_artifacts(evicted)
+        freed += evicted_bytes
+        total -= evicted_bytes
+
+    EXPORT_DISK_BYTES.set(total)
+    return {"expired": len(expired), "evicted": len(evicted), "freed_bytes": freed, "total_bytes": total}
+
+def scan_export_dir() -> List[Tuple[str, float]]:
+    with os.scandir(EXPORTS_DIR) as entries:
+        return [(entry.name, entry.stat().st_mtime) for entry in entries if entry.is_file()]
+
+async def cleanup_export_dir() -> Dict[str, int]:
+    """Drop leftover .part files, untracked files and records whose file is gone"""
+    files = await asyncio.to_thread(scan_export_dir)
+    tracked = {artifact["id"] async for artifact in db.export_artifacts.find({}, {"_id": 0, "id": 1})}
+    cutoff = time.time() - EXPORT_ORPHAN_GRACE_SECONDS
+    on_disk = {name for name, _ in files}
+
+    stale = [name for name, mtime in files if name not in tracked and mtime < cutoff]
+    await asyncio.to_thread(remove_export_files, stale)
+    missing = list(tracked - on_disk)
+    if missing:
+        await db.export_artifacts.delete_many({"id": {"$in": missing}})
+    return {
+        "partial_files": sum(1 for name in stale if name.endswith(PARTIAL_SUFFIX)),
+        "orphaned_files": sum(1 for name in stale if not name.endswith(PARTIAL_SUFFIX)),
+        "missing_files": len(missing)
+    }
+
+async def manage_export_artifacts():
+    try:
+        removed = await cleanup_export_dir()
+        if any(removed.values()):
+            logger.info(f"Export directory cleanup: {removed}")
+    except Exception as e:
+        logger.warning(f"Export directory cleanup failed: {e}")
+    while True:
+        try:
+            await sweep_export_artifacts()
+        except Exception as e:
+            logger.warning(f"Export artifact sweep failed: {e}")
+        if EXPORT_SWEEP_INTERVAL <= 0:
+            return
+        await asyncio.sleep(EXPORT_SWEEP_INTERVAL)
+
 @api_router.post("/export")
-async def export_animation(export_request: ExportRequest):
-    """Export animation as video/GIF (placeholder implementation)"""
+async def export_animation(export_request: ExportRequest, request: Request):
+    """Render the project's animation and encode it as video/GIF"""
+    EXPORT_QUEUE_DEPTH.inc()
     try:
         # Get project data
         project = await db.animated_projects.find_one({"id": export_request.project_id})
@@ -554,42 +2003,407 @@ async def export_animation(export_request: ExportRequest):
             raise HTTPException(status_code=404, detail="Template not found")
         
         # Generate export filename
-        export_filename = f"{project['name'].replace(' ', '_')}_{uuid.uuid4().hex[:8]}.{export_request.format}"
+        fmt = export_output_format(export_request.format)
+        export_filename = export_file_name(project["name"], fmt)
         export_path = EXPORTS_DIR / export_filename
         
-        # For now, create a simple placeholder file
-        # In a real implementation, this would render the animation to video
         export_data = {
-            "project": project,
-            "template": template,
+            "project_id": project["id"],
+            "template_id": template["id"],
+            "template_type": template["type"],
             "export_settings": export_request.dict(),
             "created_at": datetime.utcnow().isoformat(),
-            "format": export_request.format,
+            "format": fmt,
             "dimensions": f"{export_request.width}x{export_request.height}",
             "duration": f"{export_request.duration}ms"
         }
         
-        # Write export metadata (in real implementation, this would be video data)
-        with open(export_path, 'w') as f:
-            json.dump(export_data, f, indent=2)
+        # Render off the event loop; the config falls back to the template defaults
+        config = {**template.get("default_config", {}), **project.get("config", {})}
+        render_started = time.perf_counter()
+        await render_scheduler.run(
+            "export", render_client(request), write_atomically, export_path,
+            lambda partial: render_animation(
+                template["type"], config, partial, fmt,
+                export_request.width, export_request.height, export_request.duration, export_request.quality, export_data
+            )
+        )
+        RENDER_DURATION.observe(time.perf_counter() - render_started, template_type=template["type"])
+        await db.export_artifacts.insert_one(export_artifact(export_path, project_id=project["id"], format=fmt))
         
         return {
             "export_id": export_filename,
             "download_url": f"/api/exports/{export_filename}",
             "status": "completed",
-            "format": export_request.format,
+            "format": fmt,
+            "requested_format": export_request.format,
             "file_size": os.path.getsize(export_path)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Export failed: {str(e)}")
+    finally:
+        EXPORT_QUEUE_DEPTH.dec()
+
+@api_router.post("/export/batch")
+async def export_batch(batch: BatchExportRequest, request: Request):
+    """Render many variants of one project as a single job group.
+
+    The project and template are loaded once and every variant shares one frame
+    cache, so frames that are identical across variants are rasterized once.
+    """
+    variant_count = batch_variant_count(batch)
+    if variant_count > BATCH_EXPORT_MAX_VARIANTS:
+        raise HTTPException(status_code=422, detail=f"Batch expands to {variant_count} variants; the limit is {BATCH_EXPORT_MAX_VARIANTS}")
+    project = await db.animated_projects.find_one({"id": batch.project_id})
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    template = await db.animated_templates.find_one({"id": project["template_id"]})
+    if not template:
+        raise HTTPException(status_code=404, detail="Template not found")
+
+    variants = batch_variants(batch)
+
+    group_id = str(uuid.uuid4())
+    base_config = {**template.get("default_config", {}), **project.get("config", {})}
+    settings = batch.dict(exclude={"project_id", "overrides", "sweep", "archive"})
+    await db.export_groups.insert_one({
+        "id": group_id,
+        "project_id": project["id"],
+        "variant_count": len(variants),
+        "settings": settings,
+        "status": "running",
+        "created_at": datetime.utcnow()
+    })
+
+    frame_cache = FrameCache(BATCH_FRAME_CACHE_FRAMES)
+    fmt = export_output_format(batch.format)
+
+    def render_variant(index: int, override: Dict[str, Any]) -> Dict[str, Any]:
+        export_filename = export_file_name(project["name"], fmt, f"_v{index}")
+        export_path = EXPORTS_DIR / export_filename
+        header = {
+            "project_id": project["id"],
+            "template_id": template["id"],
+            "template_type": template["type"],
+            "group_id": group_id,
+            "variant": index,
+            "overrides": override,
+            "export_settings": settings,
+            "created_at": datetime.utcnow().isoformat()
+        }
+        started = time.perf_counter()
+        write_atomically(export_path, lambda partial: render_animation(
+            template["type"], {**base_config, **override}, partial, fmt,
+            batch.width, batch.height, batch.duration, batch.quality, header, frame_cache
+        ))
+        RENDER_DURATION.observe(time.perf_counter() - started, template_type=template["type"])
+        return {
+            "variant": index,
+            "overrides": override,
+            "export_id": export_filename,
+            "download_url": f"/api/exports/{export_filename}",
+            "file_size": export_path.stat().st_size
+        }
+
+    # One job per variant lets other clients' work interleave with the batch
+    client_id = render_client(request)
+    EXPORT_QUEUE_DEPTH.inc(len(variants))
+    try:
+        outcomes = await asyncio.gather(
+            *[render_scheduler.run("batch", client_id, render_variant, index, override) for index, override in enumerate(variants)],
+            return_exceptions=True
+        )
+    finally:
+        EXPORT_QUEUE_DEPTH.dec(len(variants))
+    results = [outcome for outcome in outcomes if not isinstance(outcome, BaseException)]
+    failures = [outcome for outcome in outcomes if isinstance(outcome, BaseException)]
+    if failures:
+        # Variants finished before the failure are never handed out
+        await asyncio.to_thread(remove_export_files, [result["export_id"] for result in results])
+        await db.export_groups.update_one({"id": group_id}, {"$set": {"status": "failed", "error": str(failures[0])}})
+        raise HTTPException(status_code=500, detail=f"Batch export failed: {str(failures[0])}")
+
+    response = {
+        "group_id": group_id,
+        "status": "completed",
+        "format": fmt,
+        "requested_format": batch.format,
+        "variant_count": len(results),
+        "shared_frames": frame_cache.hits,
+        "rendered_frames": frame_cache.misses
+    }
+    if batch.archive:
+        archive_name = export_file_name(project["name"], "zip", "_batch")
+
+        def write_archive(partial: Path):
+            # Encoded video does not compress further, so entries are stored
+            with zipfile.ZipFile(partial, "w", zipfile.ZIP_STORED) as archive:
+                for result in results:
+                    archive.write(EXPORTS_DIR / result["export_id"], arcname=result["export_id"])
+            remove_export_files([result["export_id"] for result in results])
+
+        await asyncio.to_thread(write_atomically, EXPORTS_DIR / archive_name, write_archive)
+        await db.export_artifacts.insert_one(export_artifact(EXPORTS_DIR / archive_name, project_id=project["id"], group_id=group_id, format="zip"))
+        response.update({
+            "export_id": archive_name,
+            "download_url": f"/api/exports/{archive_name}",
+            "file_size": (EXPORTS_DIR / archive_name).stat().st_size
+        })
+    else:
+        await db.export_artifacts.insert_many([
+            export_artifact(EXPORTS_DIR / result["export_id"], project_id=project["id"], group_id=group_id, format=fmt)
+            for result in results
+        ])
+        response["variants"] = results
+
+    await db.export_groups.update_one({"id": group_id}, {"$set": {"status": "completed", "completed_at": datetime.utcnow()}})
+    return response
+
+# Checkpointed export jobs for long renders. A job renders its frames in
+# segments of EXPORT_SEGMENT_FRAMES; each finished segment is written to disk
+# and recorded in export_jobs before the next one starts. Whoever holds the
+# job's lease renews it after every segment, so when a worker dies the lease
+# lapses and the job is picked up again (at startup or by the periodic
+# recovery sweep) and resumes after its last completed segment.
+EXPORT_SEGMENT_FRAMES = int(os.environ.get("EXPORT_SEGMENT_FRAMES", "120"))
+EXPORT_JOB_LEASE_SECONDS = int(os.environ.get("EXPORT_JOB_LEASE_SECONDS", "120"))
+EXPORT_JOB_RECOVERY_INTERVAL = int(os.environ.get("EXPORT_JOB_RECOVERY_INTERVAL", "60"))  # seconds, 0 only recovers at startup
+EXPORT_JOB_MAX_ATTEMPTS = int(os.environ.get("EXPORT_JOB_MAX_ATTEMPTS", "3"))
+EXPORT_JOB_RETRY_DELAY = int(os.environ.get("EXPORT_JOB_RETRY_DELAY", "30"))  # seconds, multiplied by the attempt number
+EXPORT_JOB_ACTIVE = ["queued", "running"]
+
+export_job_tasks: Dict[str, asyncio.Task] = {}
+# job id -> lease owner token, for the jobs this process holds
+export_job_leases: Dict[str, str] = {}
+
+class ExportJobLeaseLost(Exception):
+    """The job's lease lapsed and another worker claimed it"""
+
+def export_job_dir(job_id: str) -> Path:
+    return EXPORTS_DIR / ".jobs" / job_id
+
+def export_segment_path(job: Dict[str, Any], index: int) -> Path:
+    return export_job_dir(job["id"]) / f"segment_{index:05d}.{EXPORT_EXTENSIONS.get(job['format'], job['format'])}"
+
+def export_job_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    view = {
+        "job_id": job["id"],
+        "project_id": job["project_id"],
+        "status": job["status"],
+        "format": job["format"],
+        "segments_done": len(job.get("segments_done", [])),
+        "segments_total": job["segments_total"],
+        "progress": round(len(job.get("segments_done", [])) / job["segments_total"], 4),
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"]
+    }
+    if job.get("export_id"):
+        view.update({"export_id": job["export_id"], "download_url": f"/api/exports/{job['export_id']}"})
+    if job.get("error"):
+        view.update({"error": job["error"], "attempts": job.get("attempts", 0)})
+    return view
+
+async def claim_export_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Take the job's lease; the conditional update is what makes the claim exclusive.
+
+    The random owner token lets every later write check that the lease is
+    still ours rather than taken over after it lapsed.
+    """
+    now = datetime.utcnow()
+    result = await db.export_jobs.update_one(
+        {"id": job_id, "status": {"$in": EXPORT_JOB_ACTIVE}, "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]},
+        {"$set": {
+            "status": "running", "lease_owner": uuid.uuid4().hex,
+            "lease_until": now + timedelta(seconds=EXPORT_JOB_LEASE_SECONDS), "updated_at": now
+        }}
+    )
+    if not result.modified_count:
+        return None
+    return await db.export_jobs.find_one({"id": job_id}, {"_id": 0})
+
+def render_export_segment(job: Dict[str, Any], times: List[float], path: Path) -> int:
+    frames = (rasterize(build_scene(job["template_type"], job["config"], t), job["width"], job["height"]) for t in times)
+    return write_atomically(path, lambda partial: encode_segment(
+        frames, partial, job["format"], job["width"], job["height"], job["fps"], job["quality"]
+    ))
+
+async def update_leased_job(job: Dict[str, Any], update: Dict[str, Any]):
+    result = await db.export_jobs.update_one({"id": job["id"], "lease_owner": job["lease_owner"]}, update)
+    if not result.matched_count:
+        raise ExportJobLeaseLost(job["id"])
+
+def renewed_lease() -> Dict[str, Any]:
+    now = datetime.utcnow()
+    return {"lease_until": now + timedelta(seconds=EXPORT_JOB_LEASE_SECONDS), "updated_at": now}
+
+async def run_export_job(job_id: str):
+    job = await claim_export_job(job_id)
+    if not job:
+        return  # finished, or another worker holds the lease
+    export_job_leases[job_id] = job["lease_owner"]
+    directory = export_job_dir(job_id)
+    await asyncio.to_thread(directory.mkdir, parents=True, exist_ok=True)
+    times = frame_times(job["duration"], job["fps"])
+    size = job["segment_frames"]
+    done = set(job.get("segments_done", []))
+
+    EXPORT_QUEUE_DEPTH.inc()
+    try:
+        for index in range(job["segments_total"]):
+            path = export_segment_path(job, index)
+            if index in done and path.exists():
+                continue
+            started = time.perf_counter()
+            await render_scheduler.run("export", job["client_id"], render_export_segment, job, times[index * size:(index + 1) * size], path)
+            RENDER_DURATION.observe(time.perf_counter() - started, template_type=job["template_type"])
+            # The checkpoint and the lease renewal are one write
+            await update_leased_job(job, {"$addToSet": {"segments_done": index}, "$set": renewed_lease()})
+
+        # Renew right before the join so the lease covers it
+        await update_leased_job(job, {"$set": renewed_lease()})
+        export_filename = export_file_name(job["project_name"], job["format"])
+        export_path = EXPORTS_DIR / export_filename
+        header = {
+            "project_id": job["project_id"],
+            "template_id": job["template_id"],
+            "template_type": job["template_type"],
+            "job_id": job_id,
+            "export_settings": job["settings"],
+            "created_at": datetime.utcnow().isoformat()
+        }
+        segments = [export_segment_path(job, index) for index in range(job["segments_total"])]
+        await asyncio.to_thread(write_atomically, export_path, lambda partial: join_segments(
+            segments, partial, job["format"], job["width"], job["height"], job["fps"], header
+        ))
+        now = datetime.utcnow()
+        try:
+            await update_leased_job(job, {"$set": {
+                "status": "completed", "export_id": export_filename, "error": None,
+                "lease_owner": None, "lease_until": None, "updated_at": now, "completed_at": now
+            }})
+        except ExportJobLeaseLost:
+            # The new owner produces its own file
+            await asyncio.to_thread(export_path.unlink, True)
+            raise
+        await db.export_artifacts.insert_one(export_artifact(export_path, project_id=job["project_id"], job_id=job_id, format=job["format"]))
+        await asyncio.to_thread(shutil.rmtree, directory, True)
+    except asyncio.CancelledError:
+        # Shutting down: keep the checkpoint for whoever resumes the job
+        raise
+    except ExportJobLeaseLost:
+        # Another worker owns the job and its checkpoint now; leave both alone
+        logger.warning(f"Export job {job_id} lease was taken over; stopping")
+    except Exception as e:
+        attempts = job.get("attempts", 0) + 1
+        now = datetime.utcnow()
+        if attempts < EXPORT_JOB_MAX_ATTEMPTS:
+            # Keep the finished segments; the lease doubles as the retry
+            # backoff, so recovery picks the job up again once it lapses
+            logger.warning(f"Export job {job_id} attempt {attempts} failed, will retry: {e}")
+            await db.export_jobs.update_one({"id": job_id, "lease_owner": job["lease_owner"]}, {"$set": {
+                "status": "queued", "error": str(e), "attempts": attempts, "updated_at": now, "lease_owner": None,
+                "lease_until": now + timedelta(seconds=EXPORT_JOB_RETRY_DELAY * attempts)
+            }})
+            return
+        logger.warning(f"Export job {job_id} failed after {attempts} attempts: {e}")
+        result = await db.export_jobs.update_one({"id": job_id, "lease_owner": job["lease_owner"]}, {"$set": {
+            "status": "failed", "error": str(e), "attempts": attempts, "lease_owner": None, "lease_until": None, "updated_at": now
+        }})
+        if result.matched_count:
+            await asyncio.to_thread(shutil.rmtree, directory, True)
+    finally:
+        export_job_leases.pop(job_id, None)
+        EXPORT_QUEUE_DEPTH.dec()
+
+def start_export_job(job_id: str):
+    if job_id in export_job_tasks:
+        return
+    task = asyncio.create_task(run_export_job(job_id))
+    export_job_tasks[job_id] = task
+    task.add_done_callback(lambda _: export_job_tasks.pop(job_id, None))
+
+async def recover_export_jobs():
+    """Start every unfinished job whose lease is free or has lapsed"""
+    cursor = db.export_jobs.find(
+        {"status": {"$in": EXPORT_JOB_ACTIVE}, "$or": [{"lease_until": None}, {"lease_until": {"$lt": datetime.utcnow()}}]},
+        {"_id": 0, "id": 1}
+    )
+    async for job in cursor:
+        start_export_job(job["id"])
+
+async def recover_export_jobs_periodically():
+    while True:
+        try:
+            await recover_export_jobs()
+        except Exception as e:
+            logger.warning(f"Export job recovery failed: {e}")
+        if EXPORT_JOB_RECOVERY_INTERVAL <= 0:
+            return
+        await asyncio.sleep(EXPORT_JOB_RECOVERY_INTERVAL)
+
+@api_router.post("/export/jobs", status_code=202)
+async def create_export_job(export_request: ExportRequest, request: Request):
+    """Queue a resumable export; poll the job for progress and the download URL"""
+    if export_request.format == VECTOR_FORMAT:
+        raise HTTPException(status_code=400, detail="Vector exports render instantly; use /api/export")
+    project = await db.animated_projects.find_one({"id": export_request.project_id})
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    template = await db.animated_templates.find_one({"id": project["template_id"]})
+    if not template:
+        raise HTTPException(status_code=404, detail="Template not found")
+
+    fps = QUALITY_FPS.get(export_request.quality, 30)
+    frames_total = len(frame_times(export_request.duration, fps))
+    now = datetime.utcnow()
+    job = {
+        "id": str(uuid.uuid4()),
+        "project_id": project["id"],
+        "project_name": project["name"],
+        "template_id": template["id"],
+        "template_type": template["type"],
+        # Resolved now so a resumed job renders exactly what was requested
+        "config": {**template.get("default_config", {}), **project.get("config", {})},
+        "settings": export_request.dict(),
+        "format": export_output_format(export_request.format),
+        "width": export_request.width,
+        "height": export_request.height,
+        "duration": export_request.duration,
+        "quality": export_request.quality,
+        "fps": fps,
+        "frames_total": frames_total,
+        "segment_frames": EXPORT_SEGMENT_FRAMES,
+        "segments_total": math.ceil(frames_total / EXPORT_SEGMENT_FRAMES),
+        "segments_done": [],
+        "attempts": 0,
+        "client_id": render_client(request),
+        "status": "queued",
+        "lease_until": None,
+        "created_at": now,
+        "updated_at": now
+    }
+    await db.export_jobs.insert_one(job)
+    start_export_job(job["id"])
+    return export_job_view(job)
+
+@api_router.get("/export/jobs/{job_id}")
+async def get_export_job(job_id: str):
+    job = await db.export_jobs.find_one({"id": job_id}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return export_job_view(job)
 
 @api_router.get("/exports/{export_id}")
 async def download_export(export_id: str):
     """Download exported animation file"""
     export_path = EXPORTS_DIR / export_id
-    if not export_path.exists():
+    if export_id.endswith(PARTIAL_SUFFIX) or not export_path.is_file():
         raise HTTPException(status_code=404, detail="Export file not found")
+    await db.export_artifacts.update_one({"id": export_id}, {"$set": {"last_accessed_at": datetime.utcnow()}})
+    DOWNLOAD_BYTES.inc(export_path.stat().st_size, kind="export")
     
     return FileResponse(
         path=export_path,
@@ -597,7 +2411,498 @@ async def download_export(export_id: str):
         media_type="application/octet-stream"
     )
 
+# Server-side previews. Frames are sampled from the same time grid an export at
+# the requested quality would use and drawn from the same scenes, but rasterized
+# directly at preview size rather than downscaled from an export frame.
+PREVIEW_CACHE_FRAMES = int(os.environ.get("PREVIEW_CACHE_FRAMES", "512"))
+
+# Shared across projects: editing one parameter only changes the scenes of the
+# frames it affects, and every other frame is served from here
+preview_cache = FrameCache(PREVIEW_CACHE_FRAMES)
+
+def encode_png(frame: "np.ndarray") -> bytes:
+    """Encode an RGB frame as a truecolor PNG"""
+    height, width = frame.shape[:2]
+    # Each scanline is prefixed with filter type 0 (None)
+    rows = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    rows[:, 1:] = frame.reshape(height, width * 3)
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    return b"".join([
+        b"\x89PNG\r\n\x1a\n",
+        chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)),
+        chunk(b"IDAT", zlib.compress(rows.tobytes(), 6)),
+        chunk(b"IEND", b"")
+    ])
+
+def preview_times(duration_ms: int, fps: int, count: int) -> List[float]:
+    """Pick ``count`` evenly spaced timestamps from the export frame grid"""
+    # Index straight into the grid frame_times would build, without building it
+    total = max(1, math.ceil(duration_ms / 1000 * fps))
+    if count >= total:
+        indices = range(total)
+    elif count == 1:
+        indices = [0]
+    else:
+        indices = [round(i * (total - 1) / (count - 1)) for i in range(count)]
+    return [i * 1000 / fps for i in indices]
+
+@api_router.post("/projects/{project_id}/preview")
+async def preview_project(project_id: str, preview: PreviewRequest, request: Request):
+    """Render a handful of low-resolution frames of the scenes the export would draw"""
+    project = await db.animated_projects.find_one({"id": project_id}, {"_id": 0, "template_id": 1, "config": 1})
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    template = await db.animated_templates.find_one({"id": project["template_id"]}, {"_id": 0, "type": 1, "default_config": 1})
+    if not template:
+        raise HTTPException(status_code=404, detail="Template not found")
+
+    config = {**template.get("default_config", {}), **project.get("config", {}), **preview.config}
+    times = preview_times(preview.duration, QUALITY_FPS.get(preview.quality, 30), preview.frames)
+
+    def render_preview():
+        tally = {}
+        frames = [preview_cache.render(build_scene(template["type"], config, t), preview.width, preview.height, tally) for t in times]
+        return frames, tally.get("misses", 0)
+
+    frames, rendered = await render_scheduler.run("interactive", render_client(request), render_preview)
+    headers = {"x-preview-rendered": str(rendered), "x-preview-times": ",".join(f"{t:g}" for t in times)}
+
+    if preview.layout == "sprite":
+        sheet = await asyncio.to_thread(lambda: encode_png(np.hstack(frames)))
+        return Response(content=sheet, media_type="image/png", headers=headers)
+    encoded = await asyncio.to_thread(lambda: [base64.b64encode(encode_png(frame)).decode() for frame in frames])
+    return JSONResponse(
+        {
+            "times": times,
+            "width": preview.width,
+            "height": preview.height,
+            "frames": [f"data:image/png;base64,{data}" for data in encoded]
+        },
+        headers=headers
+    )
+
+# Streaming NDJSON exports for sync jobs. The Motor cursor is consumed batch by
+# batch so memory stays flat regardless of collection size.
+STREAM_BATCH_SIZE = int(os.environ.get("STREAM_BATCH_SIZE", "500"))
+
+def ndjson_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+async def ndjson_rows(cursor):
+    lines = []
+    async for doc in cursor:
+        doc.pop("_id", None)
+        lines.append(json.dumps(doc, default=ndjson_default))
+        if len(lines) >= STREAM_BATCH_SIZE:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+def ndjson_response(collection, fields: Optional[str], model) -> StreamingResponse:
+    projection = fields_projection(fields, model) or {"_id": 0}
+    cursor = collection.find({}, projection).batch_size(STREAM_BATCH_SIZE)
+    return StreamingResponse(ndjson_rows(cursor), media_type="application/x-ndjson")
+
+@api_router.get("/stream/motion-graphics")
+async def stream_motion_graphics(fields: Optional[str] = None):
+    return ndjson_response(db.motion_graphics, fields, MotionGraphic)
+
+@api_router.get("/stream/projects")
+async def stream_projects(fields: Optional[str] = None):
+    return ndjson_response(db.animated_projects, fields, AnimatedProject)
+
 # Original Motion Graphics Endpoints (keeping existing functionality)
+# MP4/MOV metadata probe. Only the box headers are read while seeking to the
+# moov box (wherever it sits in the file), and only moov itself is loaded, so
+# probing costs the same for a 5 MB clip and a 5 GB master.
+MEDIA_PROBE_EXTENSIONS = {".mp4", ".m4v", ".mov"}
+MEDIA_PROBE_VERSION = 2  # bump when probe_upload learns something new so the backfill reruns
+MEDIA_PROBE_BACKFILL = os.environ.get("MEDIA_PROBE_BACKFILL", "1") == "1"
+MP4_CONTAINER_BOXES = {b"trak", b"mdia", b"minf", b"stbl"}
+MOOV_MAX_BYTES = 64 * 1024 * 1024
+
+def iter_boxes(data: bytes, start: int, end: int):
+    """Yield (type, payload start, box end) for the boxes in data[start:end]"""
+    while start + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", data, start)
+        header = 8
+        if size == 1:
+            size, header = struct.unpack_from(">Q", data, start + 8)[0], 16
+        elif size == 0:
+            size = end - start
+        if size < header:
+            return
+        yield kind, start + header, min(end, start + size)
+        start += size
+
+def read_top_level_box(f, wanted: bytes) -> Optional[bytes]:
+    f.seek(0, os.SEEK_END)
+    file_end = f.tell()
+    offset = 0
+    while offset + 8 <= file_end:
+        f.seek(offset)
+        head = f.read(16)
+        size, kind = struct.unpack(">I4s", head[:8])
+        header = 8
+        if size == 1 and len(head) == 16:
+            size, header = struct.unpack(">Q", head[8:16])[0], 16
+        elif size == 0:
+            size = file_end - offset
+        if size < header:
+            return None
+        if kind == wanted:
+            if size - header > MOOV_MAX_BYTES:
+                return None
+            f.seek(offset + header)
+            return f.read(size - header)
+        offset += size
+    return None
+
+def probe_track(moov: bytes, start: int, end: int) -> Dict[str, Any]:
+    boxes = {}
+
+    def walk(box_start: int, box_end: int):
+        for kind, payload, payload_end in iter_boxes(moov, box_start, box_end):
+            if kind in MP4_CONTAINER_BOXES:
+                walk(payload, payload_end)
+            else:
+                boxes.setdefault(kind, payload)
+
+    walk(start, end)
+    track = {}
+    if b"hdlr" in boxes:
+        track["handler"] = moov[boxes[b"hdlr"] + 8:boxes[b"hdlr"] + 12]
+    if b"tkhd" in boxes:
+        at = boxes[b"tkhd"]
+        # Display size is 16.16 fixed point after the times, ids, volume and matrix
+        width, height = struct.unpack_from(">II", moov, at + 4 + (32 if moov[at] == 1 else 20) + 52)
+        track["width"], track["height"] = width >> 16, height >> 16
+    timescale = 0
+    if b"mdhd" in boxes:
+        at = boxes[b"mdhd"]
+        timescale = struct.unpack_from(">I", moov, at + 4 + (16 if moov[at] == 1 else 8))[0]
+    if b"stsd" in boxes:
+        entry = boxes[b"stsd"] + 8
+        track["codec"] = moov[entry + 4:entry + 8].decode("latin-1").strip()
+        # Visual sample entries carry the coded size when tkhd has none
+        track["coded_size"] = struct.unpack_from(">HH", moov, entry + 32)
+    if b"stts" in boxes and timescale:
+        at = boxes[b"stts"]
+        count = struct.unpack_from(">I", moov, at + 4)[0]
+        samples = ticks = 0
+        for sample_count, delta in struct.iter_unpack(">II", moov[at + 8:at + 8 + count * 8]):
+            samples += sample_count
+            ticks += sample_count * delta
+        if ticks:
+            track["fps"] = round(samples * timescale / ticks, 3)
+    return track
+
+def probe_media(path: Path) -> Dict[str, Any]:
+    """Duration, display size, frame rate and codec of an MP4/MOV file; {} if it cannot be read"""
+    try:
+        with open(path, "rb") as f:
+            moov = read_top_level_box(f, b"moov")
+        if moov is None:
+            return {}
+        probe = {}
+        for kind, payload, end in iter_boxes(moov, 0, len(moov)):
+            if kind == b"mvhd":
+                timescale, duration = struct.unpack_from(">IQ" if moov[payload] == 1 else ">II", moov, payload + 4 + (16 if moov[payload] == 1 else 8))
+                if timescale:
+                    probe["duration"] = round(duration / timescale, 3)
+            elif kind == b"trak" and "codec" not in probe:
+                track = probe_track(moov, payload, end)
+                if track.get("handler") != b"vide":
+                    continue
+                width, height = track.get("width"), track.get("height")
+                if not (width and height) and track.get("coded_size"):
+                    width, height = track["coded_size"]
+                probe.update({"width": width or None, "height": height or None, "fps": track.get("fps"), "codec": track.get("codec")})
+        return probe
+    except (OSError, struct.error, IndexError) as e:
+        logger.debug(f"Media probe failed for {path}: {e}")
+        return {}
+
+# ZIP packs are indexed from the central directory at the end of the archive
+# through mmap, so only the pages holding the directory are ever read. Single
+# entries are then streamed straight from their offset in the archive.
+ZIP_EOCD_SIGNATURE = b"PK\x05\x06"
+ZIP64_EOCD_LOCATOR_SIGNATURE = b"PK\x06\x07"
+ZIP_CENTRAL_SIGNATURE = b"PK\x01\x02"
+ZIP_LOCAL_SIGNATURE = b"PK\x03\x04"
+ZIP_EOCD_SEARCH = 22 + 65535  # record plus the longest possible comment
+ZIP_STREAM_CHUNK = 1024 * 1024
+
+def zip64_extra(extra: bytes, fields: List[int]) -> List[int]:
+    """Replace the 0xFFFFFFFF placeholders in ``fields`` from the ZIP64 extra field"""
+    for kind, payload, end in iter_zip_extra(extra):
+        if kind != 1:
+            continue
+        values = list(struct.unpack_from(f"<{(end - payload) // 8}Q", extra, payload))
+        return [values.pop(0) if value == 0xFFFFFFFF and values else value for value in fields]
+    return fields
+
+def iter_zip_extra(extra: bytes):
+    at = 0
+    while at + 4 <= len(extra):
+        kind, size = struct.unpack_from("<HH", extra, at)
+        yield kind, at + 4, min(len(extra), at + 4 + size)
+        at += 4 + size
+
+def index_zip_entries(path: Path) -> Optional[List[Dict[str, Any]]]:
+    """List the file entries of a ZIP archive; None if it is not a readable archive"""
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            eocd = mm.rfind(ZIP_EOCD_SIGNATURE, max(0, len(mm) - ZIP_EOCD_SEARCH))
+            if eocd < 0:
+                return None
+            count, directory_size, directory_offset = struct.unpack_from("<HII", mm, eocd + 10)
+            locator = eocd - 20
+            if locator >= 0 and mm[locator:locator + 4] == ZIP64_EOCD_LOCATOR_SIGNATURE:
+                record = struct.unpack_from("<Q", mm, locator + 8)[0]
+                count, directory_size, directory_offset = struct.unpack_from("<QQQ", mm, record + 32)
+
+            entries = []
+            at = directory_offset
+            for _ in range(count):
+                if mm[at:at + 4] != ZIP_CENTRAL_SIGNATURE:
+                    return None
+                flags, method = struct.unpack_from("<HH", mm, at + 8)
+                crc, compressed, size, name_length, extra_length, comment_length = struct.unpack_from("<IIIHHH", mm, at + 16)
+                offset = struct.unpack_from("<I", mm, at + 42)[0]
+                name_bytes = mm[at + 46:at + 46 + name_length]
+                extra = mm[at + 46 + name_length:at + 46 + name_length + extra_length]
+                size, compressed, offset = zip64_extra(extra, [size, compressed, offset])
+                # Bit 11 marks UTF-8 names; older tools write cp437
+                name = name_bytes.decode("utf-8" if flags & 0x800 else "cp437")
+                if not name.endswith("/") and not flags & 0x1:
+                    entries.append({"name": name, "size": size, "compressed_size": compressed, "method": method, "crc32": crc, "offset": offset})
+                at += 46 + name_length + extra_length + comment_length
+            return entries
+    except (OSError, ValueError, struct.error) as e:
+        logger.debug(f"ZIP index failed for {path}: {e}")
+        return None
+
+def stream_zip_entry(path: Path, entry: Dict[str, Any]):
+    """Yield an entry's uncompressed bytes by reading it in place"""
+    with open(path, "rb") as f:
+        f.seek(entry["offset"])
+        header = f.read(30)
+        if header[:4] != ZIP_LOCAL_SIGNATURE:
+            raise ValueError("Corrupt local file header")
+        # The local name/extra lengths can differ from the central directory's
+        name_length, extra_length = struct.unpack_from("<HH", header, 26)
+        f.seek(entry["offset"] + 30 + name_length + extra_length)
+        remaining = entry["compressed_size"]
+        # Never emit more than the indexed size, so a crafted deflate stream
+        # can neither balloon memory nor overrun the declared Content-Length
+        budget = entry["size"]
+        decompressor = zlib.decompressobj(-15) if entry["method"] == 8 else None
+        while remaining > 0 and budget > 0:
+            chunk = f.read(min(ZIP_STREAM_CHUNK, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            if not decompressor:
+                chunk = chunk[:budget]
+                budget -= len(chunk)
+                yield chunk
+                continue
+            while chunk and budget > 0:
+                data = decompressor.decompress(chunk, min(ZIP_STREAM_CHUNK, budget))
+                chunk = decompressor.unconsumed_tail
+                budget -= len(data)
+                if data:
+                    yield data
+        if decompressor and budget > 0:
+            data = decompressor.flush()[:budget]
+            if data:
+                yield data
+
+def probe_upload(path: Path) -> Dict[str, Any]:
+    suffix = path.suffix.lower()
+    if suffix == ".zip":
+        entries = index_zip_entries(path)
+        return {"zip_entries": entries} if entries is not None else {}
+    if suffix not in MEDIA_PROBE_EXTENSIONS:
+        return {}
+    return {key: value for key, value in probe_media(path).items() if value is not None}
+
+async def backfill_media_probes() -> Dict[str, int]:
+    """Probe every graphic that has not been probed yet"""
+    probed = failed = 0
+    cursor = db.motion_graphics.find({"media_probe_version": {"$not": {"$gte": MEDIA_PROBE_VERSION}}}, {"_id": 0, "id": 1, "file_path": 1})
+    async for graphic in cursor:
+        metadata = await asyncio.to_thread(probe_upload, Path(graphic["file_path"]))
+        await db.motion_graphics.update_one({"id": graphic["id"]}, {"$set": {**metadata, "media_probe_version": MEDIA_PROBE_VERSION}})
+        if metadata:
+            probed += 1
+        else:
+            failed += 1
+    return {"probed": probed, "unreadable": failed}
+
+async def backfill_media_probes_in_background():
+    try:
+        result = await backfill_media_probes()
+        if any(result.values()):
+            logger.info(f"Media probe backfill: {result}")
+    except Exception as e:
+        logger.warning(f"Media probe backfill failed: {e}")
+
+# Perceptual hashing for near-duplicate detection. PHASH_FRAMES frames are
+# sampled across each video (frame extraction needs ffmpeg; without it hashing
+# is skipped) and each gets a 64-bit DCT hash. The per-frame hashes are
+# concatenated, so the Hamming distance between two video hashes is the sum of
+# the per-frame distances. Lookups split the long hash into chunks and use the
+# pigeonhole bound in MultiIndexHash, so a radius search only probes small
+# Hamming balls around each query chunk instead of comparing every hash.
+PHASH_FRAMES = 4
+PHASH_SIZE = 32  # frames are reduced to 32x32 grey before the DCT
+PHASH_DUPLICATE_DISTANCE = int(os.environ.get("PHASH_DUPLICATE_DISTANCE", "40"))  # of 64 * PHASH_FRAMES bits
+PHASH_MAX_SEARCH_DISTANCE = 64  # keeps the multi-index probe ball small
+PHASH_EXTENSIONS = {".mp4", ".m4v", ".mov", ".avi"}
+
+@functools.lru_cache(maxsize=None)
+def dct_matrix(n: int) -> "np.ndarray":
+    k = np.arange(n)
+    matrix = np.cos(np.pi * (2 * k[None, :] + 1) * k[:, None] / (2 * n)) * math.sqrt(2 / n)
+    matrix[0] /= math.sqrt(2)
+    return matrix
+
+def frame_phash(gray: "np.ndarray") -> int:
+    """64-bit pHash: the low 8x8 DCT coefficients compared to their median"""
+    matrix = dct_matrix(gray.shape[0])
+    low = (matrix @ gray.astype(np.float64) @ matrix.T)[:8, :8].flatten()
+    bits = low > np.median(low[1:])  # the DC term would dominate the median
+    return int("".join("1" if bit else "0" for bit in bits), 2)
+
+def sample_video_frames(path: Path, duration: Optional[float]) -> List["np.ndarray"]:
+    if not FFMPEG_BINARY:
+        return []
+    times = [duration * (i + 0.5) / PHASH_FRAMES for i in range(PHASH_FRAMES)] if duration else [float(i) for i in range(PHASH_FRAMES)]
+    frames = []
+    for t in times:
+        result = subprocess.run(
+            [FFMPEG_BINARY, "-loglevel", "error", "-ss", f"{t:.3f}", "-i", str(path), "-frames:v", "1",
+             "-vf", f"scale={PHASH_SIZE}:{PHASH_SIZE},format=gray", "-f", "rawvideo", "-"],
+            capture_output=True, timeout=60
+        )
+        if result.returncode != 0 or len(result.stdout) < PHASH_SIZE * PHASH_SIZE:
+            return []
+        frames.append(np.frombuffer(result.stdout[:PHASH_SIZE * PHASH_SIZE], dtype=np.uint8).reshape(PHASH_SIZE, PHASH_SIZE))
+    return frames
+
+def video_phash(path: Path, duration: Optional[float]) -> Optional[str]:
+    if path.suffix.lower() not in PHASH_EXTENSIONS:
+        return None
+    frames = sample_video_frames(path, duration)
+    if len(frames) != PHASH_FRAMES:
+        return None
+    combined = 0
+    for frame in frames:
+        combined = (combined << 64) | frame_phash(frame)
+    return f"{combined:0{PHASH_FRAMES * 16}x}"
+
+PHASH_INDEX_CHUNK_BITS = 16  # sub-hash width of the multi-index; 64 * PHASH_FRAMES must divide evenly
+
+@functools.lru_cache(maxsize=None)
+def hamming_ball(bits: int, radius: int) -> Tuple[int, ...]:
+    """Every ``bits``-wide mask with at most ``radius`` bits set"""
+    return tuple(
+        sum(1 << bit for bit in positions)
+        for flipped in range(radius + 1)
+        for positions in itertools.combinations(range(bits), flipped)
+    )
+
+class MultiIndexHash:
+    """Exact Hamming-radius lookup over long hashes by multi-index hashing.
+
+    Each hash is cut into fixed-width chunks with one table per chunk position.
+    Two hashes within distance r differ by at most r // chunks bits in some
+    chunk (pigeonhole), so a search only probes that small ball around each
+    query chunk and verifies the candidates it finds with the full distance.
+    """
+
+    def __init__(self, hash_bits: int = 64 * PHASH_FRAMES, chunk_bits: int = PHASH_INDEX_CHUNK_BITS):
+        self.chunk_bits = chunk_bits
+        self.chunks = hash_bits // chunk_bits
+        self.clear()
+
+    def clear(self):
+        # hash -> graphic ids, and per chunk position: chunk value -> hashes
+        self.values: Dict[int, set] = {}
+        self.tables: List[Dict[int, set]] = [{} for _ in range(self.chunks)]
+
+    def split(self, value: int) -> List[int]:
+        mask = (1 << self.chunk_bits) - 1
+        return [(value >> (i * self.chunk_bits)) & mask for i in range(self.chunks)]
+
+    def add(self, value: int, graphic_id: str):
+        ids = self.values.get(value)
+        if ids is None:
+            ids = self.values[value] = set()
+            for table, chunk in zip(self.tables, self.split(value)):
+                table.setdefault(chunk, set()).add(value)
+        ids.add(graphic_id)
+
+    def remove(self, value: int, graphic_id: str):
+        ids = self.values.get(value)
+        if ids is None or graphic_id not in ids:
+            return
+        ids.discard(graphic_id)
+        if ids:
+            return
+        del self.values[value]
+        for table, chunk in zip(self.tables, self.split(value)):
+            bucket = table[chunk]
+            bucket.discard(value)
+            if not bucket:
+                del table[chunk]
+
+    def search(self, value: int, max_distance: int) -> List[Tuple[int, str]]:
+        ball = hamming_ball(self.chunk_bits, min(max_distance // self.chunks, self.chunk_bits))
+        candidates = set()
+        for table, chunk in zip(self.tables, self.split(value)):
+            for flip in ball:
+                candidates.update(table.get(chunk ^ flip, ()))
+        matches = []
+        for candidate in candidates:
+            distance = bin(candidate ^ value).count("1")
+            if distance <= max_distance:
+                matches.extend((distance, graphic_id) for graphic_id in self.values[candidate])
+        return sorted(matches)
+
+phash_index = MultiIndexHash()
+
+async def build_phash_index():
+    phash_index.clear()
+    async for graphic in db.motion_graphics.find({"phash": {"$type": "string"}}, {"_id": 0, "id": 1, "phash": 1}):
+        phash_index.add(int(graphic["phash"], 16), graphic["id"])
+
+async def backfill_phashes():
+    """Hash graphics stored before hashing existed (or before ffmpeg was installed)"""
+    if not FFMPEG_BINARY:
+        return
+    cursor = db.motion_graphics.find({"phash": {"$exists": False}}, {"_id": 0, "id": 1, "file_path": 1, "duration": 1})
+    async for graphic in cursor:
+        phash = await asyncio.to_thread(video_phash, Path(graphic["file_path"]), graphic.get("duration"))
+        # A null hash records that the file could not be hashed
+        await db.motion_graphics.update_one({"id": graphic["id"]}, {"$set": {"phash": phash}})
+        if phash:
+            phash_index.add(int(phash, 16), graphic["id"])
+
+async def backfill_phashes_in_background():
+    try:
+        await backfill_phashes()
+    except Exception as e:
+        logger.warning(f"Perceptual hash backfill failed: {e}")
+
 @api_router.post("/motion-graphics", response_model=MotionGraphic)
 async def upload_motion_graphic(
     title: str = Form(...),
@@ -605,7 +2910,8 @@ async def upload_motion_graphic(
     category: str = Form(...),
     tags: str = Form("[]"),
     format: str = Form(...),
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    reject_duplicates: bool = Form(False)
 ):
     try:
         tags_list = json.loads(tags)
@@ -630,7 +2936,17 @@ async def upload_motion_graphic(
         raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
 
     file_size = os.path.getsize(file_path)
+    UPLOAD_BYTES.inc(file_size, kind="motion_graphic")
     thumbnail_base64 = generate_thumbnail_placeholder(category)
+    media = await asyncio.to_thread(probe_upload, file_path)
+    phash = await asyncio.to_thread(video_phash, file_path, media.get("duration"))
+    matches = phash_index.search(int(phash, 16), PHASH_DUPLICATE_DISTANCE) if phash else []
+    if matches and reject_duplicates:
+        file_path.unlink(missing_ok=True)
+        raise HTTPException(status_code=409, detail={
+            "message": "Upload matches an existing motion graphic",
+            "duplicates": [{"id": graphic_id, "distance": distance} for distance, graphic_id in matches[:10]]
+        })
 
     motion_graphic_data = {
         "title": title,
@@ -641,25 +2957,265 @@ async def upload_motion_graphic(
         "file_path": str(file_path),
         "file_size": file_size,
         "thumbnail_base64": thumbnail_base64,
-        "format": format
+        "format": format,
+        "phash": phash,
+        "duplicate_of": matches[0][1] if matches else None,
+        **media
     }
     
     motion_graphic = MotionGraphic(**motion_graphic_data)
-    await db.motion_graphics.insert_one(motion_graphic.dict())
+    await db.motion_graphics.insert_one({**motion_graphic.dict(), "media_probe_version": MEDIA_PROBE_VERSION})
+    await bump_stats({"total_graphics": 1, f"category_counts.{category}": 1})
+    suggest_index.add(motion_graphic.dict())
+    if phash:
+        phash_index.add(int(phash, 16), motion_graphic.id)
     
     return motion_graphic
 
-@api_router.get("/motion-graphics", response_model=List[MotionGraphic])
+async def motion_graphics_facets(category_match: Dict[str, Any], base_query: Dict[str, Any], limit: int, offset: int, projection: Optional[Dict[str, int]] = None):
+    """Fetch one page of results plus category/format/tag counts in a single $facet aggregation.
+
+    The category facet ignores the selected category so clients can show counts for
+    the other categories too; every other facet is scoped to the full query.
+    """
+    def counts(field: str, extra_stages: List[Dict[str, Any]] = []) -> List[Dict[str, Any]]:
+        return extra_stages + [
+            {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}}
+        ]
+
+    facet_pipeline = {
+        "results": [{"$match": category_match}, {"$skip": offset}, {"$limit": limit}, {"$project": listing_projection(projection)}],
+        "total": [{"$match": category_match}, {"$count": "count"}],
+        "category": counts("category"),
+        "format": counts("format", [{"$match": category_match}]),
+        "tags": counts("tags", [{"$match": category_match}, {"$unwind": "$tags"}]) + [{"$limit": FACET_TAGS_LIMIT}]
+    }
+    rows = await db.motion_graphics.aggregate([{"$match": base_query}, {"$facet": facet_pipeline}]).to_list(1)
+    row = rows[0] if rows else {}
+
+    def facet_counts(name: str) -> List[FacetCount]:
+        return [FacetCount(value=str(c["_id"]), count=c["count"]) for c in row.get(name, []) if c["_id"] is not None]
+
+    total = row["total"][0]["count"] if row.get("total") else 0
+    facets = MotionGraphicFacets(
+        category=facet_counts("category"),
+        format=facet_counts("format"),
+        tags=facet_counts("tags")
+    )
+    if projection:
+        return document_response({"results": row.get("results", []), "total": total, "facets": facets.dict()})
+    return FacetedMotionGraphics(
+        results=[MotionGraphic(**mg) for mg in row.get("results", [])],
+        total=total,
+        facets=facets
+    )
+
+# Trending/popular rankings. Trending uses forward exponential decay: each download
+# adds exp(decay * (t - epoch)) to a graphic's score, stored as a log so it never
+# overflows. Ordering by the stored score equals ordering by the decayed score at
+# any instant, so scores only change when a download happens.
+RANKING_TOP_N = int(os.environ.get("RANKING_TOP_N", "100"))
+# Other workers' downloads only reach this worker's lists through a reload
+RANKING_REFRESH_INTERVAL = int(os.environ.get("RANKING_REFRESH_INTERVAL", "30"))  # seconds, 0 disables
+TRENDING_HALF_LIFE_HOURS = float(os.environ.get("TRENDING_HALF_LIFE_HOURS", "24"))
+TRENDING_DECAY = math.log(2) / (TRENDING_HALF_LIFE_HOURS * 3600)
+TRENDING_EPOCH = datetime(2024, 1, 1)
+RANKING_SORTS = {"trending": "trend_score", "popular": "download_count"}
+ALL_CATEGORIES = "all"
+
+def trending_exponent(at: datetime) -> float:
+    return TRENDING_DECAY * (at - TRENDING_EPOCH).total_seconds()
+
+def add_log_scores(field: str, b: float) -> Dict[str, Any]:
+    """Aggregation expression for log(exp(field) + exp(b)), evaluated by the server.
+
+    A missing score takes b; otherwise the larger term is factored out so the
+    sum never overflows.
+    """
+    log_sum = {"$let": {
+        "vars": {"high": {"$max": [f"${field}", b]}, "low": {"$min": [f"${field}", b]}},
+        "in": {"$add": ["$$high", {"$ln": {"$add": [1, {"$exp": {"$subtract": ["$$low", "$$high"]}}]}}]}
+    }}
+    return {"$cond": [{"$eq": [{"$ifNull": [f"${field}", None]}, None]}, b, log_sum]}
+
+class RankingIndex:
+    """In-memory top-N lists per (sort, category), mirrored from db.rankings"""
+
+    def __init__(self):
+        # (sort, category) -> [(score, graphic id)] sorted by score descending
+        self.top: Dict[Tuple[str, str], List[Tuple[float, str]]] = {}
+
+    def load(self, sort: str, category: str, rows: List[Dict[str, Any]]):
+        field = RANKING_SORTS[sort]
+        self.top[(sort, category)] = [(row[field], row["id"]) for row in rows]
+
+    def remove(self, graphic_id: str) -> List[Tuple[str, str]]:
+        """Drop a graphic from every list; return the full lists that need a refill"""
+        refill = []
+        for key, ranked in self.top.items():
+            kept = [entry for entry in ranked if entry[1] != graphic_id]
+            if len(kept) != len(ranked):
+                if len(ranked) >= RANKING_TOP_N:
+                    refill.append(key)
+                self.top[key] = kept
+        return refill
+
+    def update(self, ranking: Dict[str, Any]):
+        for category in (ranking["category"], ALL_CATEGORIES):
+            for sort, field in RANKING_SORTS.items():
+                current = self.top.setdefault((sort, category), [])
+                score = ranking[field]
+                # Scores only grow, so a lower one is a reply that lost a race
+                if any(entry[1] == ranking["id"] and entry[0] > score for entry in current):
+                    continue
+                ranked = [entry for entry in current if entry[1] != ranking["id"]]
+                if len(ranked) < RANKING_TOP_N or score > ranked[-1][0]:
+                    # Scores are negated so bisect keeps the list in descending order
+                    keys = [-entry[0] for entry in ranked]
+                    ranked.insert(bisect.bisect_right(keys, -score), (score, ranking["id"]))
+                    del ranked[RANKING_TOP_N:]
+                self.top[(sort, category)] = ranked
+
+    def page(self, sort: str, category: str, offset: int, limit: int) -> Optional[List[str]]:
+        """Ids for one page, or None when the page reaches past the in-memory top-N"""
+        ranked = self.top.get((sort, category), [])
+        if offset + limit > len(ranked) and len(ranked) >= RANKING_TOP_N:
+            return None
+        return [graphic_id for _, graphic_id in ranked[offset:offset + limit]]
+
+ranking_index = RankingIndex()
+ranking_lock = asyncio.Lock()
+
+async def load_ranking_list(sort: str, category: str):
+    query = {} if category == ALL_CATEGORIES else {"category": category}
+    field = RANKING_SORTS[sort]
+    rows = await db.rankings.find(query, {"_id": 0}).sort(field, -1).limit(RANKING_TOP_N).to_list(length=None)
+    ranking_index.load(sort, category, rows)
+
+async def load_rankings():
+    # Seed rankings for graphics downloaded before the ranking subsystem existed,
+    # treating their past downloads as if they happened now
+    if await db.rankings.count_documents({}) == 0:
+        now_exponent = trending_exponent(datetime.utcnow())
+        graphics = db.motion_graphics.find({"download_count": {"$gt": 0}}, {"_id": 0, "id": 1, "category": 1, "download_count": 1})
+        rankings = [{
+            "id": mg["id"],
+            "category": mg["category"],
+            "download_count": mg["download_count"],
+            "trend_score": math.log(mg["download_count"]) + now_exponent
+        } async for mg in graphics]
+        if rankings:
+            try:
+                await db.rankings.insert_many(rankings, ordered=False)
+            except BulkWriteError as e:
+                # Another worker seeded (or a download recorded) some ids first
+                if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                    raise
+    await load_ranking_lists()
+
+async def load_ranking_lists():
+    for sort in RANKING_SORTS:
+        for category in CATEGORIES + [ALL_CATEGORIES]:
+            await load_ranking_list(sort, category)
+
+async def refresh_rankings_periodically():
+    while True:
+        await asyncio.sleep(RANKING_REFRESH_INTERVAL)
+        try:
+            await load_ranking_lists()
+        except Exception as e:
+            logger.warning(f"Ranking refresh failed: {e}")
+
+async def record_ranking_download(motion_graphic: Dict[str, Any]):
+    # One pipeline update so concurrent downloads (across workers too) never
+    # lose an increment to a read-modify-write race
+    ranking = await db.rankings.find_one_and_update(
+        {"id": motion_graphic["id"]},
+        [{"$set": {
+            "category": motion_graphic["category"],
+            "download_count": {"$add": [{"$ifNull": ["$download_count", 0]}, 1]},
+            "trend_score": add_log_scores("trend_score", trending_exponent(datetime.utcnow()))
+        }}],
+        projection={"_id": 0},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    ranking_index.update(ranking)
+
+async def remove_ranking(graphic_id: str):
+    async with ranking_lock:
+        await db.rankings.delete_one({"id": graphic_id})
+        for sort, category in ranking_index.remove(graphic_id):
+            await load_ranking_list(sort, category)
+
+async def move_ranking_category(graphic_id: str, category: str):
+    async with ranking_lock:
+        ranking = await db.rankings.find_one_and_update(
+            {"id": graphic_id},
+            {"$set": {"category": category}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+        if ranking:
+            for sort, old_category in ranking_index.remove(graphic_id):
+                await load_ranking_list(sort, old_category)
+            ranking_index.update(ranking)
+
+# Internal bookkeeping that gallery listings never return; pack entry lists can
+# run to thousands of rows and are served per graphic instead
+LISTING_EXCLUDED_FIELDS = {"zip_entries": 0, "media_probe_version": 0}
+
+def listing_projection(projection: Optional[Dict[str, int]]) -> Dict[str, int]:
+    """Merge the listing exclusions into a default or exclusion-only projection"""
+    if projection and any(projection.get(f) for f in projection if f != "_id"):
+        # fields= inclusion projections already leave everything else out
+        return projection
+    return {**(projection or {}), **LISTING_EXCLUDED_FIELDS}
+
+async def ranked_motion_graphics(sort: str, category_match: Dict[str, Any], query: Dict[str, Any], limit: int, offset: int, projection: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+    category = category_match.get("category", ALL_CATEGORIES)
+    projection = listing_projection(projection)
+    if query:
+        # A search only re-filters the in-memory top-N, keeping the cost bounded
+        candidates = [graphic_id for _, graphic_id in ranking_index.top.get((sort, category), [])]
+        matching = {mg["id"]: mg for mg in await db.motion_graphics.find({**query, "id": {"$in": candidates}}, projection).to_list(length=None)}
+        return [matching[graphic_id] for graphic_id in candidates if graphic_id in matching][offset:offset + limit]
+
+    ids = ranking_index.page(sort, category, offset, limit)
+    if ids is None:
+        rows = db.rankings.find(category_match, {"_id": 0, "id": 1}).sort(RANKING_SORTS[sort], -1).skip(offset).limit(limit)
+        ids = [row["id"] for row in await rows.to_list(length=None)]
+    docs = {mg["id"]: mg for mg in await db.motion_graphics.find({"id": {"$in": ids}}, projection).to_list(length=None)}
+    return [docs[graphic_id] for graphic_id in ids if graphic_id in docs]
+
+@api_router.get("/motion-graphics", response_model=Union[List[MotionGraphic], FacetedMotionGraphics])
 async def get_motion_graphics(
     category: Optional[str] = None,
     search: Optional[str] = None,
     limit: int = 20,
-    offset: int = 0
+    offset: int = 0,
+    facets: bool = False,
+    sort: Optional[str] = None,  # "trending" or "popular"; only graphics with downloads are ranked
+    fields: Optional[str] = None,
+    codec: Optional[str] = None,
+    min_width: Optional[int] = None,
+    min_height: Optional[int] = None,
+    min_fps: Optional[float] = None,
+    min_duration: Optional[float] = None,
+    max_duration: Optional[float] = None
 ):
+    projection = fields_projection(fields, MotionGraphic)
+    find_projection = listing_projection(projection)
     query = {}
     
-    if category and category in CATEGORIES:
-        query["category"] = category
+    # Probed media metadata filters
+    if codec:
+        query["codec"] = codec
+    for field, bound, value in (("width", "$gte", min_width), ("height", "$gte", min_height), ("fps", "$gte", min_fps),
+                                ("duration", "$gte", min_duration), ("duration", "$lte", max_duration)):
+        if value is not None:
+            query.setdefault(field, {})[bound] = value
     
     if search:
         query["$or"] = [
@@ -668,11 +3224,208 @@ async def get_motion_graphics(
             {"tags": {"$regex": search, "$options": "i"}}
         ]
     
-    cursor = db.motion_graphics.find(query).skip(offset).limit(limit)
-    motion_graphics = await cursor.to_list(length=None)
+    category_match = {"category": category} if category and category in CATEGORIES else {}
+    
+    if facets:
+        return await motion_graphics_facets(category_match, query, limit, offset, projection)
     
+    if sort:
+        if sort not in RANKING_SORTS:
+            raise HTTPException(status_code=400, detail=f"Invalid sort. Must be one of: {list(RANKING_SORTS)}")
+        motion_graphics = await ranked_motion_graphics(sort, category_match, query, limit, offset, projection)
+    else:
+        cursor = db.motion_graphics.find({**query, **category_match}, find_projection).skip(offset).limit(limit)
+        motion_graphics = await cursor.to_list(length=None)
+    
+    if projection:
+        return document_response(motion_graphics)
     return [MotionGraphic(**mg) for mg in motion_graphics]
 
+# Prefix autocomplete: a sorted array of normalized title word-suffixes and tags,
+# looked up with bisect so keystroke suggestions never touch Mongo.
+SUGGEST_DEFAULT_LIMIT = 10
+SUGGEST_TOP_K = 50  # also the largest limit a client may ask for
+SUGGEST_TOP_PREFIX = 2  # prefixes up to this length keep a maintained top-k list
+
+def normalize_suggest_text(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return " ".join(re.split(r"[^0-9a-z]+", text)).strip()
+
+class SuggestIndex:
+    """Prefix suggestions ranked by downloads.
+
+    Suggestions are ("title", graphic id) or ("tag", normalized tag) keys.
+    Titles rank by their own downloads, tags by the downloads of every graphic
+    carrying them. One- and two-character prefixes match too much of the
+    catalog to scan per keystroke, so each keeps its top SUGGEST_TOP_K keys:
+    score increases reorder the list in place, and a decrease or removal of a
+    listed key drops the list to be rebuilt by the next lookup. Longer
+    prefixes scan their slice of the sorted entries.
+    """
+
+    def __init__(self):
+        # (normalized key, kind, display text, graphic id), kept sorted
+        self.entries: List[Tuple[str, str, str, str]] = []
+        # graphic id -> {"entries": [...], "title": str, "tags": {normalized tag}, "download_count": int}
+        self.graphics: Dict[str, Dict[str, Any]] = {}
+        # normalized tag -> {"text": display text, "score": int, "graphics": int}
+        self.tags: Dict[str, Dict[str, Any]] = {}
+        # short prefix -> suggestion keys, best first
+        self.top: Dict[str, List[Tuple[str, str]]] = {}
+
+    @staticmethod
+    def entries_for(motion_graphic: Dict[str, Any]) -> List[Tuple[str, str, str, str]]:
+        graphic_id = motion_graphic["id"]
+        entries = set()
+        title = motion_graphic.get("title") or ""
+        words = normalize_suggest_text(title).split()
+        # Every word-suffix of the title so "bur" matches "Fire Burst"
+        for i in range(len(words)):
+            entries.add((" ".join(words[i:]), "title", title, graphic_id))
+        for tag in motion_graphic.get("tags") or []:
+            key = normalize_suggest_text(str(tag))
+            if key:
+                entries.add((key, "tag", str(tag), graphic_id))
+        return sorted(entries)
+
+    def score(self, key: Tuple[str, str]) -> int:
+        kind, value = key
+        return self.graphics[value]["download_count"] if kind == "title" else self.tags[value]["score"]
+
+    def text(self, key: Tuple[str, str]) -> str:
+        kind, value = key
+        return self.graphics[value]["title"] if kind == "title" else self.tags[value]["text"]
+
+    def rank(self, key: Tuple[str, str]) -> Tuple[int, str, str]:
+        # Ties break alphabetically so results are stable between lookups
+        return (-self.score(key), self.text(key).lower(), key[1])
+
+    def short_prefixes(self, key: Tuple[str, str]) -> set:
+        kind, value = key
+        keys = [entry[0] for entry in self.graphics[value]["entries"] if entry[1] == "title"] if kind == "title" else [value]
+        return {k[:n] for k in keys for n in range(1, SUGGEST_TOP_PREFIX + 1) if len(k) >= n}
+
+    def raised(self, key: Tuple[str, str]):
+        """Reposition a key whose score grew (or that just appeared) in the cached lists"""
+        for prefix in self.short_prefixes(key):
+            top = self.top.get(prefix)
+            if top is None:
+                continue
+            if key not in top:
+                # A list shorter than k already holds every key under its prefix
+                if len(top) >= SUGGEST_TOP_K and self.rank(key) >= self.rank(top[-1]):
+                    continue
+                top.append(key)
+            top.sort(key=self.rank)
+            del top[SUGGEST_TOP_K:]
+
+    def lowered(self, key: Tuple[str, str]):
+        """Drop cached lists holding a key whose score fell or that is going away"""
+        for prefix in self.short_prefixes(key):
+            if key in self.top.get(prefix, ()):
+                del self.top[prefix]
+
+    def matching_keys(self, prefix: str) -> set:
+        keys = set()
+        i = bisect.bisect_left(self.entries, (prefix,))
+        while i < len(self.entries) and self.entries[i][0].startswith(prefix):
+            key, kind, _, graphic_id = self.entries[i]
+            keys.add((kind, graphic_id) if kind == "title" else (kind, key))
+            i += 1
+        return keys
+
+    def insert(self, motion_graphic: Dict[str, Any]) -> List[Tuple[str, str, str, str]]:
+        entries = self.entries_for(motion_graphic)
+        downloads = motion_graphic.get("download_count", 0)
+        tags: Dict[str, str] = {}
+        for key, kind, display, _ in entries:
+            if kind == "tag":
+                tags.setdefault(key, display)
+        for key, display in tags.items():
+            tag = self.tags.setdefault(key, {"text": display, "score": 0, "graphics": 0})
+            tag["score"] += downloads
+            tag["graphics"] += 1
+        self.graphics[motion_graphic["id"]] = {
+            "entries": entries,
+            "title": motion_graphic.get("title") or "",
+            "tags": set(tags),
+            "download_count": downloads
+        }
+        return entries
+
+    def build(self, motion_graphics: List[Dict[str, Any]]):
+        self.entries = []
+        self.graphics = {}
+        self.tags = {}
+        self.top = {}
+        for mg in motion_graphics:
+            self.entries.extend(self.insert(mg))
+        self.entries.sort()
+
+    def add(self, motion_graphic: Dict[str, Any]):
+        self.remove(motion_graphic["id"])
+        for entry in self.insert(motion_graphic):
+            bisect.insort(self.entries, entry)
+        graphic = self.graphics[motion_graphic["id"]]
+        self.raised(("title", motion_graphic["id"]))
+        for tag in graphic["tags"]:
+            self.raised(("tag", tag))
+
+    def remove(self, graphic_id: str):
+        graphic = self.graphics.get(graphic_id)
+        if not graphic:
+            return
+        self.lowered(("title", graphic_id))
+        for key in graphic["tags"]:
+            tag = self.tags[key]
+            tag["score"] -= graphic["download_count"]
+            tag["graphics"] -= 1
+            if graphic["download_count"] or not tag["graphics"]:
+                self.lowered(("tag", key))
+            if not tag["graphics"]:
+                del self.tags[key]
+        del self.graphics[graphic_id]
+        for entry in graphic["entries"]:
+            i = bisect.bisect_left(self.entries, entry)
+            if i < len(self.entries) and self.entries[i] == entry:
+                del self.entries[i]
+
+    def record_download(self, graphic_id: str):
+        graphic = self.graphics.get(graphic_id)
+        if not graphic:
+            return
+        graphic["download_count"] += 1
+        self.raised(("title", graphic_id))
+        for key in graphic["tags"]:
+            self.tags[key]["score"] += 1
+            self.raised(("tag", key))
+
+    def suggest(self, prefix: str, limit: int) -> List[Dict[str, Any]]:
+        prefix = normalize_suggest_text(prefix)
+        if not prefix:
+            return []
+        if len(prefix) <= SUGGEST_TOP_PREFIX:
+            if prefix not in self.top:
+                self.top[prefix] = heapq.nsmallest(SUGGEST_TOP_K, self.matching_keys(prefix), key=self.rank)
+            keys = self.top[prefix][:limit]
+        else:
+            keys = heapq.nsmallest(limit, self.matching_keys(prefix), key=self.rank)
+        return [
+            {"text": self.text(key), "type": key[0], "id": key[1] if key[0] == "title" else None, "score": self.score(key)}
+            for key in keys
+        ]
+
+suggest_index = SuggestIndex()
+
+async def build_suggest_index():
+    cursor = db.motion_graphics.find({}, {"_id": 0, "id": 1, "title": 1, "tags": 1, "download_count": 1})
+    suggest_index.build(await cursor.to_list(length=None))
+
+@api_router.get("/motion-graphics/suggest")
+async def suggest_motion_graphics(q: str, limit: int = SUGGEST_DEFAULT_LIMIT):
+    return {"query": q, "suggestions": suggest_index.suggest(q, max(1, min(limit, SUGGEST_TOP_K)))}
+
 @api_router.get("/motion-graphics/{motion_graphic_id}", response_model=MotionGraphic)
 async def get_motion_graphic(motion_graphic_id: str):
     motion_graphic = await db.motion_graphics.find_one({"id": motion_graphic_id})
@@ -695,6 +3448,10 @@ async def download_motion_graphic(motion_graphic_id: str):
         {"id": motion_graphic_id},
         {"$inc": {"download_count": 1}}
     )
+    await bump_stats({"total_downloads": 1})
+    suggest_index.record_download(motion_graphic_id)
+    await record_ranking_download(motion_graphic)
+    DOWNLOAD_BYTES.inc(file_path.stat().st_size, kind="motion_graphic")
     
     return FileResponse(
         path=file_path,
@@ -702,6 +3459,59 @@ async def download_motion_graphic(motion_graphic_id: str):
         media_type="application/octet-stream"
     )
 
+@api_router.get("/motion-graphics/{motion_graphic_id}/duplicates")
+async def find_motion_graphic_duplicates(motion_graphic_id: str, max_distance: int = PHASH_DUPLICATE_DISTANCE):
+    motion_graphic = await db.motion_graphics.find_one({"id": motion_graphic_id}, {"_id": 0, "phash": 1})
+    if not motion_graphic:
+        raise HTTPException(status_code=404, detail="Motion graphic not found")
+    if not motion_graphic.get("phash"):
+        raise HTTPException(status_code=400, detail="Motion graphic has no perceptual hash")
+    if not 0 <= max_distance <= PHASH_MAX_SEARCH_DISTANCE:
+        raise HTTPException(status_code=400, detail=f"max_distance must be between 0 and {PHASH_MAX_SEARCH_DISTANCE}")
+    
+    matches = [(d, graphic_id) for d, graphic_id in phash_index.search(int(motion_graphic["phash"], 16), max_distance) if graphic_id != motion_graphic_id]
+    docs = {mg["id"]: mg for mg in await db.motion_graphics.find(
+        {"id": {"$in": [graphic_id for _, graphic_id in matches]}}, {"_id": 0, "id": 1, "title": 1, "category": 1}
+    ).to_list(None)}
+    return [{**docs[graphic_id], "distance": distance} for distance, graphic_id in matches if graphic_id in docs]
+
+@api_router.get("/motion-graphics/{motion_graphic_id}/entries", response_model=List[ZipEntry])
+async def list_motion_graphic_entries(motion_graphic_id: str):
+    motion_graphic = await db.motion_graphics.find_one({"id": motion_graphic_id}, {"_id": 0, "zip_entries": 1})
+    if not motion_graphic:
+        raise HTTPException(status_code=404, detail="Motion graphic not found")
+    if motion_graphic.get("zip_entries") is None:
+        raise HTTPException(status_code=400, detail="Motion graphic is not an indexed ZIP pack")
+    return motion_graphic["zip_entries"]
+
+@api_router.get("/motion-graphics/{motion_graphic_id}/entries/{entry_name:path}")
+async def download_motion_graphic_entry(motion_graphic_id: str, entry_name: str):
+    """Stream one file out of a ZIP pack without extracting the archive"""
+    motion_graphic = await db.motion_graphics.find_one({"id": motion_graphic_id}, {"_id": 0, "file_path": 1, "zip_entries": 1})
+    if not motion_graphic:
+        raise HTTPException(status_code=404, detail="Motion graphic not found")
+    if motion_graphic.get("zip_entries") is None:
+        raise HTTPException(status_code=400, detail="Motion graphic is not an indexed ZIP pack")
+    entry = next((e for e in motion_graphic["zip_entries"] if e["name"] == entry_name), None)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Entry not found in pack")
+    if entry["method"] not in (0, 8):
+        raise HTTPException(status_code=415, detail=f"Unsupported compression method {entry['method']}")
+    file_path = Path(motion_graphic["file_path"])
+    if not file_path.exists():
+        raise HTTPException(status_code=404, detail="File not found on server")
+    
+    DOWNLOAD_BYTES.inc(entry["size"], kind="zip_entry")
+    filename = Path(entry_name).name
+    return StreamingResponse(
+        stream_zip_entry(file_path, entry),
+        media_type=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+        headers={
+            "Content-Length": str(entry["size"]),
+            "Content-Disposition": f"attachment; filename*=UTF-8''{urllib.parse.quote(filename)}"
+        }
+    )
+
 @api_router.put("/motion-graphics/{motion_graphic_id}", response_model=MotionGraphic)
 async def update_motion_graphic(motion_graphic_id: str, update_data: MotionGraphicUpdate):
     existing_mg = await db.motion_graphics.find_one({"id": motion_graphic_id})
@@ -715,8 +3525,15 @@ async def update_motion_graphic(motion_graphic_id: str, update_data: MotionGraph
             {"id": motion_graphic_id},
             {"$set": update_dict}
         )
+        if update_dict.get("category", existing_mg["category"]) != existing_mg["category"]:
+            await bump_stats({
+                f"category_counts.{existing_mg['category']}": -1,
+                f"category_counts.{update_dict['category']}": 1
+            })
+            await move_ranking_category(motion_graphic_id, update_dict["category"])
     
     updated_mg = await db.motion_graphics.find_one({"id": motion_graphic_id})
+    suggest_index.add(updated_mg)
     return MotionGraphic(**updated_mg)
 
 @api_router.delete("/motion-graphics/{motion_graphic_id}")
@@ -733,43 +3550,93 @@ async def delete_motion_graphic(motion_graphic_id: str):
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Motion graphic not found")
+    await bump_stats({
+        "total_graphics": -1,
+        "total_downloads": -motion_graphic.get("download_count", 0),
+        f"category_counts.{motion_graphic['category']}": -1
+    })
+    suggest_index.remove(motion_graphic_id)
+    await remove_ranking(motion_graphic_id)
+    if motion_graphic.get("phash"):
+        phash_index.remove(int(motion_graphic["phash"], 16), motion_graphic_id)
     
     return {"message": "Motion graphic deleted successfully"}
 
-@api_router.get("/stats")
-async def get_stats():
-    total_graphics = await db.motion_graphics.count_documents({})
+# Materialized stats: a single document in db.stats kept current by the write
+# paths, so /api/stats is one point read instead of scans of the collections.
+# Every worker increments and reads the same document, so no copy goes stale.
+STATS_DOC_ID = "global"
+STATS_RECONCILE_INTERVAL = int(os.environ.get("STATS_RECONCILE_INTERVAL", "0"))  # seconds, 0 disables
+
+def empty_stats() -> Dict[str, Any]:
+    return {
+        "total_graphics": 0,
+        "total_downloads": 0,
+        "total_projects": 0,
+        "category_counts": {},
+        "template_usage": {},
+        "template_categories": {}
+    }
+
+async def rebuild_stats() -> Dict[str, Any]:
+    """Recompute stats from the source collections and reconcile the stats document"""
+    stats = empty_stats()
+    stats["total_graphics"] = await db.motion_graphics.count_documents({})
     total_downloads = await db.motion_graphics.aggregate([
         {"$group": {"_id": None, "total": {"$sum": "$download_count"}}}
     ]).to_list(1)
-    
-    total_downloads_count = total_downloads[0]["total"] if total_downloads else 0
-    
-    category_stats = await db.motion_graphics.aggregate([
-        {"$group": {"_id": "$category", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}}
-    ]).to_list(None)
-    
-    total_projects = await db.animated_projects.count_documents({})
-    template_usage = await db.animated_projects.aggregate([
-        {"$group": {"_id": "$template_id", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}}
-    ]).to_list(None)
-    
-    # Template category stats
-    template_category_stats = await db.animated_templates.aggregate([
-        {"$group": {"_id": "$category", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}}
-    ]).to_list(None)
-    
+    stats["total_downloads"] = total_downloads[0]["total"] if total_downloads else 0
+
+    async for row in db.motion_graphics.aggregate([{"$group": {"_id": "$category", "count": {"$sum": 1}}}]):
+        stats["category_counts"][row["_id"]] = row["count"]
+
+    stats["total_projects"] = await db.animated_projects.count_documents({})
+    async for row in db.animated_projects.aggregate([{"$group": {"_id": "$template_id", "count": {"$sum": 1}}}]):
+        stats["template_usage"][row["_id"]] = row["count"]
+
+    async for row in db.animated_templates.aggregate([{"$group": {"_id": "$category", "count": {"$sum": 1}}}]):
+        stats["template_categories"][row["_id"]] = row["count"]
+
+    # $set replaces each counter with the fresh snapshot but leaves any other
+    # fields on the document alone
+    await db.stats.update_one({"_id": STATS_DOC_ID}, {"$set": stats}, upsert=True)
+    return stats
+
+async def load_stats():
+    """Build the stats document if it does not exist yet"""
+    if not await db.stats.find_one({"_id": STATS_DOC_ID}, {"_id": 1}):
+        await rebuild_stats()
+
+async def bump_stats(increments: Dict[str, int]):
+    """Apply counter increments to the stats document.
+
+    Keys use Mongo dotted notation, e.g. ``{"category_counts.overlays": 1}``.
+    """
+    await db.stats.update_one({"_id": STATS_DOC_ID}, {"$inc": increments}, upsert=True)
+
+async def reconcile_stats_periodically():
+    while True:
+        await asyncio.sleep(STATS_RECONCILE_INTERVAL)
+        try:
+            await rebuild_stats()
+        except Exception as e:
+            logger.warning(f"Stats reconciliation failed: {e}")
+
+def sorted_counts(counts: Dict[str, int]) -> List[Dict[str, Any]]:
+    rows = [{"_id": key, "count": count} for key, count in counts.items() if count > 0]
+    return sorted(rows, key=lambda row: row["count"], reverse=True)
+
+@api_router.get("/stats")
+async def get_stats():
+    stats = {**empty_stats(), **(await db.stats.find_one({"_id": STATS_DOC_ID}, {"_id": 0}) or {})}
     return {
-        "total_graphics": total_graphics,
-        "total_downloads": total_downloads_count,
-        "total_projects": total_projects,
+        "total_graphics": stats["total_graphics"],
+        "total_downloads": stats["total_downloads"],
+        "total_projects": stats["total_projects"],
         "total_templates": len(DEFAULT_TEMPLATES),
-        "category_distribution": category_stats,
-        "template_usage": template_usage,
-        "template_categories": template_category_stats
+        "category_distribution": sorted_counts(stats["category_counts"]),
+        "template_usage": sorted_counts(stats["template_usage"]),
+        "template_categories": sorted_counts(stats["template_categories"])
     }
 
 def generate_thumbnail_placeholder(category: str) -> str:
@@ -808,8 +3675,392 @@ def generate_thumbnail_placeholder(category: str) -> str:
     svg_base64 = base64.b64encode(svg_bytes).decode('utf-8')
     return f"data:image/svg+xml;base64,{svg_base64}"
 
+# Admin endpoints are gated by a shared token; they are disabled when it is unset
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+def require_admin(request: Request):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if not hmac.compare_digest(request.headers.get("x-admin-token", ""), ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+# On-demand request profiling. A request carrying "X-Profile: <admin token>" is
+# profiled with cProfile and the pstats file stored under PROFILES_DIR; only the
+# PROFILE_KEEP_FORCED most recent of these are kept. With PROFILE_SAMPLE_RATE > 0
+# a random share of requests is profiled and only the PROFILE_KEEP_SLOWEST
+# slowest per route are kept. The middleware is only installed when one of these
+# modes is enabled. The token is only accepted as a header so it never lands in
+# access logs or browser history.
+PROFILING_ENABLED = os.environ.get("PROFILING", "0") == "1" and bool(ADMIN_TOKEN)
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_KEEP_SLOWEST = int(os.environ.get("PROFILE_KEEP_SLOWEST", "5"))
+PROFILE_KEEP_FORCED = int(os.environ.get("PROFILE_KEEP_FORCED", "20"))
+PROFILES_DIR = ROOT_DIR / "profiles"
+
+# id -> profile summary; route -> min-heap of (duration, id) for sampled
+# profiles; forced profile ids, oldest first; ids whose file is still wanted
+profiles: Dict[str, Dict[str, Any]] = {}
+slowest_profiles: Dict[str, List[Tuple[float, str]]] = {}
+forced_profiles: deque = deque()
+retained_profiles: set = set()
+
+class ProfilingMiddleware:
+    """Profiles flagged or sampled requests.
+
+    cProfile is per thread and every coroutine shares the event loop thread, so
+    only one request is profiled at a time and the profile can include work from
+    other requests interleaved with it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.busy = False
+
+    def requested(self, scope) -> bool:
+        if not PROFILING_ENABLED:
+            return False
+        token = dict(scope["headers"]).get(b"x-profile", b"").decode("latin-1")
+        return bool(token) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.busy:
+            return await self.app(scope, receive, send)
+        forced = self.requested(scope)
+        if not forced and random.random() >= PROFILE_SAMPLE_RATE:
+            return await self.app(scope, receive, send)
+
+        profile_id = uuid.uuid4().hex
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start" and forced:
+                message = {**message, "headers": list(message["headers"]) + [(b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        self.busy = True
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.disable()
+            self.busy = False
+            duration = time.perf_counter() - started
+            route = getattr(scope.get("route"), "path", scope["path"])
+            await self.store(profiler, profile_id, route, scope["method"], duration, forced)
+
+    @staticmethod
+    def write(profiler, profile_id: str, evicted: List[str]):
+        PROFILES_DIR.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(str(PROFILES_DIR / f"{profile_id}.pstats"))
+        for evicted_id in evicted:
+            (PROFILES_DIR / f"{evicted_id}.pstats").unlink(missing_ok=True)
+
+    async def store(self, profiler, profile_id: str, route: str, method: str, duration: float, forced: bool):
+        # Retention is decided before the write so concurrent stores see it
+        evicted = []
+        if forced:
+            forced_profiles.append(profile_id)
+            while len(forced_profiles) > PROFILE_KEEP_FORCED:
+                evicted.append(forced_profiles.popleft())
+        else:
+            slowest = slowest_profiles.setdefault(route, [])
+            if len(slowest) >= PROFILE_KEEP_SLOWEST:
+                if duration <= slowest[0][0]:
+                    return
+                evicted.append(heapq.heappop(slowest)[1])
+            heapq.heappush(slowest, (duration, profile_id))
+        retained_profiles.add(profile_id)
+        for evicted_id in evicted:
+            retained_profiles.discard(evicted_id)
+            profiles.pop(evicted_id, None)
+        # Serializing the stats takes a while for a big request; keep it off the loop
+        await asyncio.to_thread(self.write, profiler, profile_id, evicted)
+        if profile_id not in retained_profiles:
+            # Evicted by a later profile while this one was being written
+            await asyncio.to_thread((PROFILES_DIR / f"{profile_id}.pstats").unlink, True)
+            return
+        profiles[profile_id] = {
+            "id": profile_id,
+            "route": route,
+            "method": method,
+            "duration_ms": round(duration * 1000, 3),
+            "mode": "forced" if forced else "sampled",
+            "created_at": datetime.utcnow()
+        }
+
+@api_router.get("/admin/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles(route: Optional[str] = None):
+    rows = [p for p in profiles.values() if route is None or p["route"] == route]
+    return sorted(rows, key=lambda p: p["duration_ms"], reverse=True)
+
+@api_router.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def download_profile(profile_id: str):
+    """Download a pstats file; open it with snakeviz, or convert it for speedscope"""
+    if profile_id not in profiles:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(
+        path=PROFILES_DIR / f"{profile_id}.pstats",
+        filename=f"{profile_id}.pstats",
+        media_type="application/octet-stream"
+    )
+
+@api_router.post("/admin/media-probe/backfill", dependencies=[Depends(require_admin)])
+async def run_media_probe_backfill():
+    return await backfill_media_probes()
+
+@api_router.get("/admin/slow-queries", dependencies=[Depends(require_admin)])
+async def list_slow_queries(limit: int = 50):
+    shapes = sorted(slow_query_log.shapes.values(), key=lambda shape: shape["total_ms"], reverse=True)
+    return {
+        "threshold_ms": SLOW_QUERY_MS,
+        "shapes": shapes[:limit],
+        "recent": list(slow_query_log.recent)[-limit:][::-1]
+    }
+
+@api_router.get("/admin/export-artifacts", dependencies=[Depends(require_admin)])
+async def export_artifact_usage():
+    return {
+        "count": await db.export_artifacts.count_documents({}),
+        "total_bytes": await export_disk_usage(),
+        "quota_bytes": EXPORT_DISK_QUOTA_BYTES,
+        "ttl_seconds": EXPORT_TTL_SECONDS
+    }
+
+class CompressionMiddleware:
+    """Brotli/gzip compression for JSON and text responses above a size threshold.
+
+    File downloads (video, zip, octet-stream) pass through untouched. Streaming
+    responses are compressed chunk by chunk.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        accept = dict(scope["headers"]).get(b"accept-encoding", b"").decode("latin-1")
+        if "br" in accept and brotli is not None:
+            encoding = "br"
+        elif "gzip" in accept:
+            encoding = "gzip"
+        else:
+            return await self.app(scope, receive, send)
+
+        start_message = None
+        compressor = None
+
+        def compress(data: bytes, finish: bool) -> bytes:
+            if encoding == "br":
+                return compressor.process(data) + (compressor.finish() if finish else compressor.flush())
+            return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if finish else zlib.Z_SYNC_FLUSH)
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                return await send(message)
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start_message is not None:
+                headers = {k.lower(): v for k, v in start_message["headers"]}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                eligible = (
+                    b"content-encoding" not in headers
+                    and content_type.startswith(COMPRESSIBLE_TYPES)
+                    and (more_body or len(body) >= self.minimum_size)
+                )
+                if not eligible:
+                    await send(start_message)
+                    start_message = None
+                    return await send(message)
+                compressor = brotli.Compressor(quality=4) if encoding == "br" else zlib.compressobj(6, zlib.DEFLATED, 31)
+                body = compress(body, finish=not more_body)
+                new_headers = [(k, v) for k, v in start_message["headers"] if k.lower() != b"content-length"]
+                new_headers.append((b"content-encoding", encoding.encode()))
+                new_headers.append((b"vary", b"Accept-Encoding"))
+                if not more_body:
+                    new_headers.append((b"content-length", str(len(body)).encode()))
+                await send({**start_message, "headers": new_headers})
+                start_message = None
+                return await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+            if compressor is None:
+                return await send(message)
+            await send({"type": "http.response.body", "body": compress(body, finish=not more_body), "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+# Admission control for the expensive write paths. Each endpoint class admits
+# a fixed number of requests at a time and queues a bounded number more; a
+# full queue is answered with 429 and a queue wait past the timeout with 503,
+# both before the request body is read. Routes not listed here (the gallery
+# and other reads) are never held back.
+ADMISSION_DEFAULTS = {
+    # class: (concurrency, queue length, queue timeout in seconds)
+    "upload": (4, 16, 30),
+    "export": (4, 32, 30),
+    "preview": (16, 64, 5)
+}
+ADMISSION_ROUTES = [
+    ("POST", re.compile(r"^/api/motion-graphics/?$"), "upload"),
+    ("POST", re.compile(r"^/api/export(/batch|/jobs)?/?$"), "export"),
+    ("POST", re.compile(r"^/api/projects/[^/]+/preview/?$"), "preview")
+]
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+class AdmissionLimiter:
+    """A FIFO concurrency limit with a bounded, time-limited wait queue.
+
+    Waiters are plain futures on the running loop rather than an
+    asyncio.Semaphore, so one limiter can serve several event loops.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_size: int, queue_timeout: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiters: deque = deque()
+        self.service_time = 1.0  # smoothed seconds per request, for Retry-After
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.service_time * (len(self.waiters) + 1) / self.concurrency))
+
+    async def acquire(self):
+        if self.in_flight < self.concurrency and not self.waiters:
+            self.in_flight += 1
+            return
+        if len(self.waiters) >= self.queue_size:
+            raise AdmissionRejected(429, f"Too many {self.name} requests in progress", self.retry_after())
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        ADMISSION_QUEUED.inc(endpoint=self.name)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise AdmissionRejected(503, f"Timed out waiting for a {self.name} slot", self.retry_after())
+        except asyncio.CancelledError:
+            # A slot handed over just as the request went away goes to the next waiter
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            ADMISSION_QUEUED.dec(endpoint=self.name)
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+
+    def release(self, elapsed: Optional[float] = None):
+        if elapsed is not None:
+            self.service_time = 0.8 * self.service_time + 0.2 * elapsed
+        # Hand the slot straight to the oldest live waiter
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+def admission_setting(endpoint: str, name: str, default: float) -> float:
+    return float(os.environ.get(f"ADMISSION_{endpoint.upper()}_{name}", default))
+
+admission_limiters = {
+    endpoint: AdmissionLimiter(
+        endpoint,
+        int(admission_setting(endpoint, "CONCURRENCY", concurrency)),
+        int(admission_setting(endpoint, "QUEUE", queue_size)),
+        admission_setting(endpoint, "TIMEOUT", timeout)
+    )
+    for endpoint, (concurrency, queue_size, timeout) in ADMISSION_DEFAULTS.items()
+}
+
+class AdmissionMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        endpoint = next((name for method, pattern, name in ADMISSION_ROUTES if scope["method"] == method and pattern.match(scope["path"])), None)
+        if endpoint is None:
+            return await self.app(scope, receive, send)
+
+        limiter = admission_limiters[endpoint]
+        try:
+            await limiter.acquire()
+        except AdmissionRejected as e:
+            ADMISSION_REJECTIONS.inc(endpoint=endpoint, status=str(e.status_code))
+            response = JSONResponse({"detail": e.detail}, status_code=e.status_code, headers={"Retry-After": str(e.retry_after)})
+            return await response(scope, receive, send)
+
+        started = time.perf_counter()
+        ADMISSION_IN_FLIGHT.inc(endpoint=endpoint)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            ADMISSION_IN_FLIGHT.dec(endpoint=endpoint)
+            limiter.release(time.perf_counter() - started)
+
+class MetricsMiddleware:
+    """Records per-route latency by status and the number of in-flight requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            # Label by the route template, not the raw path, to keep cardinality bounded
+            route = scope.get("route")
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status["code"])
+            )
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    lines = []
+    for metric in metrics_registry:
+        lines.extend(metric.render())
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
 app.include_router(api_router)
 
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+if PROFILING_ENABLED or PROFILE_SAMPLE_RATE > 0:
+    app.add_middleware(ProfilingMiddleware)
+
+if RESPONSE_COMPRESSION:
+    app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -824,6 +4075,84 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+background_tasks: List[asyncio.Task] = []
+
+async def ensure_indexes():
+    # Fields used by the gallery filters and the $facet counts
+    await db.motion_graphics.create_index("category")
+    await db.motion_graphics.create_index("format")
+    await db.motion_graphics.create_index("tags")
+    await db.motion_graphics.create_index("codec")
+    await db.motion_graphics.create_index([("width", 1), ("height", 1)])
+    # Ranking lists are read per category in score order
+    await db.rankings.create_index("id", unique=True)
+    await db.rankings.create_index([("category", 1), ("trend_score", -1)])
+    await db.rankings.create_index([("category", 1), ("download_count", -1)])
+    await db.rankings.create_index([("trend_score", -1)])
+    await db.rankings.create_index([("download_count", -1)])
+    # Artifact sweeps expire and evict by last access
+    await db.export_artifacts.create_index("id", unique=True)
+    await db.export_artifacts.create_index("last_accessed_at")
+    await db.export_jobs.create_index("id", unique=True)
+    # Concurrent edits get distinct versions from $inc; this guards the history
+    await db.project_versions.create_index([("project_id", 1), ("version", 1)], unique=True)
+    await db.project_versions.create_index([("project_id", 1), ("kind", 1), ("version", -1)])
+    await db.export_jobs.create_index([("status", 1), ("lease_until", 1)])
+
+@app.on_event("startup")
+async def startup_indexes():
+    slow_query_log.loop = asyncio.get_running_loop()
+    await ensure_indexes()
+
+@app.on_event("startup")
+async def startup_catalog_version():
+    await refresh_catalog_version()
+
+@app.on_event("startup")
+async def startup_suggest_index():
+    await build_suggest_index()
+
+@app.on_event("startup")
+async def startup_phash_index():
+    await build_phash_index()
+    background_tasks.append(asyncio.create_task(backfill_phashes_in_background()))
+
+@app.on_event("startup")
+async def startup_rankings():
+    await load_rankings()
+    if RANKING_REFRESH_INTERVAL > 0:
+        background_tasks.append(asyncio.create_task(refresh_rankings_periodically()))
+
+@app.on_event("startup")
+async def startup_stats():
+    await load_stats()
+    if STATS_RECONCILE_INTERVAL > 0:
+        background_tasks.append(asyncio.create_task(reconcile_stats_periodically()))
+
+@app.on_event("startup")
+async def startup_export_artifacts():
+    background_tasks.append(asyncio.create_task(manage_export_artifacts()))
+
+@app.on_event("startup")
+async def startup_media_probe_backfill():
+    if MEDIA_PROBE_BACKFILL:
+        background_tasks.append(asyncio.create_task(backfill_media_probes_in_background()))
+
+@app.on_event("startup")
+async def startup_export_jobs():
+    background_tasks.append(asyncio.create_task(recover_export_jobs_periodically()))
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for task in background_tasks:
+        task.cancel()
+    # Hand unfinished jobs back right away instead of waiting for their leases to lapse
+    leases = dict(export_job_leases)
+    for task in list(export_job_tasks.values()):
+        task.cancel()
+    for job_id, owner in leases.items():
+        await db.export_jobs.update_one(
+            {"id": job_id, "lease_owner": owner, "status": "running"},
+            {"$set": {"status": "queued", "lease_owner": None, "lease_until": None}}
+        )
     client.close()
\ No newline at end of file
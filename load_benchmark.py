@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Load and Latency Benchmark for the Motion Graphics Studio API
+Starts the FastAPI app in-process, seeds a dataset of configurable size and
+drives concurrent workloads (gallery paging, search, template fetch, upload,
+download, export, preview). Reports p50/p99/throughput per workload as JSON so runs can
+be compared against a baseline across commits.
+
+Usage:
+    python load_benchmark.py --graphics 10000 --concurrency 16 --output bench.json
+    python load_benchmark.py --baseline bench.json --tolerance 0.15
+
+By default the database is an in-memory mongomock stand-in (pip install
+mongomock-motor); pass --mongo-url to benchmark against a real local mongod.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+WORKLOADS = ["gallery", "search", "templates", "upload", "download", "export", "preview"]
+SEARCH_TERMS = ["fire", "glow", "smoke", "intro", "logo", "spark", "wave", "burst"]
+SEED_BATCH_SIZE = 1000
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=Path(__file__).parent, text=True).strip()
+    except Exception:
+        return None
+
+
+class LoadBenchmark:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.work_dir = Path(tempfile.mkdtemp(prefix="motionstock_bench_"))
+        self.graphic_ids = []
+        self.project_ids = []
+        self.template_ids = []
+
+    def load_app(self):
+        """Import the server against the configured database and temporary file dirs"""
+        if self.args.mongo_url:
+            os.environ["MONGO_URL"] = self.args.mongo_url
+        os.environ.setdefault("DB_NAME", "motionstock_benchmark")
+        import server
+        # Per-request client logging would dominate the measurements
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+
+        if not self.args.mongo_url:
+            try:
+                from mongomock_motor import AsyncMongoMockClient
+            except ImportError:
+                sys.exit("mongomock-motor is not installed; install it or pass --mongo-url")
+            server.db = AsyncMongoMockClient()[os.environ["DB_NAME"]]
+        else:
+            server.db = server.client[os.environ["DB_NAME"]]
+
+        server.UPLOADS_DIR = self.work_dir / "uploads"
+        server.EXPORTS_DIR = self.work_dir / "exports"
+        server.UPLOADS_DIR.mkdir(parents=True)
+        server.EXPORTS_DIR.mkdir(parents=True)
+        self.server = server
+
+    async def seed(self):
+        """Insert graphics and projects directly so seeding 1M rows stays fast"""
+        db = self.server.db
+        await db.motion_graphics.delete_many({})
+        await db.animated_projects.delete_many({})
+        await db.animated_templates.delete_many({})
+        await db.stats.delete_many({})
+        await db.rankings.delete_many({})
+
+        # All seeded graphics share one payload file so downloads have something to serve
+        payload = self.work_dir / "payload.mp4"
+        payload.write_bytes(os.urandom(self.args.file_size))
+
+        batch = []
+        for i in range(self.args.graphics):
+            graphic_id = str(uuid.uuid4())
+            self.graphic_ids.append(graphic_id)
+            category = self.rng.choice(self.server.CATEGORIES)
+            batch.append({
+                "id": graphic_id,
+                "title": f"{self.rng.choice(SEARCH_TERMS).title()} {category} {i}",
+                "description": f"Seeded benchmark asset {i}",
+                "category": category,
+                "tags": self.rng.sample(SEARCH_TERMS, 3),
+                "filename": "payload.mp4",
+                "file_path": str(payload),
+                "file_size": self.args.file_size,
+                "duration": None,
+                "thumbnail_base64": self.server.generate_thumbnail_placeholder(category),
+                "download_count": self.rng.randint(0, 500),
+                "created_at": datetime.utcnow(),
+                "format": "mp4",
+                # Keeps the startup probe and hash backfills from touching every seeded row
+                "media_probe_version": self.server.MEDIA_PROBE_VERSION,
+                "phash": None
+            })
+            if len(batch) >= SEED_BATCH_SIZE:
+                await db.motion_graphics.insert_many(batch)
+                batch = []
+        if batch:
+            await db.motion_graphics.insert_many(batch)
+
+        await self.server.seed_default_templates()
+        templates = await db.animated_templates.find({}, {"_id": 0}).to_list(None)
+        self.template_ids = [t["id"] for t in templates]
+
+        projects = []
+        for template in templates:
+            for i in range(self.args.projects_per_template):
+                project = self.server.AnimatedProject(
+                    template_id=template["id"],
+                    name=f"{template['name']} {i}",
+                    config=dict(template["default_config"])
+                )
+                self.project_ids.append(project.id)
+                projects.append(project.dict())
+        if projects:
+            await db.animated_projects.insert_many(projects)
+
+    async def request(self, client, name):
+        if name == "gallery":
+            offset = self.rng.randint(0, max(0, min(self.args.graphics, 10000) - 20))
+            return await client.get("/api/motion-graphics", params={"limit": 20, "offset": offset})
+        if name == "search":
+            return await client.get("/api/motion-graphics", params={"search": self.rng.choice(SEARCH_TERMS), "limit": 20})
+        if name == "templates":
+            if self.rng.random() < 0.5:
+                return await client.get("/api/templates")
+            return await client.get(f"/api/templates/{self.rng.choice(self.template_ids)}")
+        if name == "upload":
+            files = {"file": ("bench.mp4", io.BytesIO(os.urandom(self.args.file_size)), "video/mp4")}
+            data = {
+                "title": f"Upload {uuid.uuid4().hex[:8]}",
+                "description": "Benchmark upload",
+                "category": self.rng.choice(self.server.CATEGORIES),
+                "tags": json.dumps(self.rng.sample(SEARCH_TERMS, 2)),
+                "format": "mp4"
+            }
+            return await client.post("/api/motion-graphics", data=data, files=files)
+        if name == "download":
+            return await client.get(f"/api/motion-graphics/{self.rng.choice(self.graphic_ids)}/download")
+        if name == "export":
+            return await client.post("/api/export", json={
+                "project_id": self.rng.choice(self.project_ids),
+                "format": "mp4",
+                "duration": 1000,
+                "width": 320,
+                "height": 240,
+                "quality": "low"
+            })
+        if name == "preview":
+            return await client.post(f"/api/projects/{self.rng.choice(self.project_ids)}/preview", json={
+                "frames": 6,
+                "width": 200,
+                "height": 150,
+                # A fresh edit each time so frames are actually rendered
+                "config": {"end_value": self.rng.randint(1, 10 ** 6)}
+            })
+        raise ValueError(f"Unknown workload: {name}")
+
+    async def run_workload(self, client, name):
+        if name == "download" and not self.graphic_ids:
+            return {"skipped": "no graphics seeded"}
+        if name in ("export", "preview") and not self.project_ids:
+            return {"skipped": "no projects seeded"}
+
+        latencies = []
+        errors = 0
+        remaining = self.args.requests
+
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                try:
+                    response = await self.request(client, name)
+                    if response.status_code >= 400:
+                        errors += 1
+                except Exception:
+                    errors += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        # Warm caches and indexes before measuring
+        for _ in range(min(self.args.warmup, self.args.requests)):
+            await self.request(client, name)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(self.args.concurrency)])
+        elapsed = time.perf_counter() - started
+
+        return {
+            "requests": len(latencies),
+            "errors": errors,
+            "p50_ms": round(percentile(latencies, 0.50), 3),
+            "p90_ms": round(percentile(latencies, 0.90), 3),
+            "p99_ms": round(percentile(latencies, 0.99), 3),
+            "mean_ms": round(statistics.mean(latencies), 3),
+            "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None
+        }
+
+    async def run(self):
+        self.load_app()
+        app = self.server.app
+        seed_started = time.perf_counter()
+        await self.seed()
+        seed_seconds = time.perf_counter() - seed_started
+
+        await app.router.startup()
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+                results = {}
+                for name in self.args.workloads:
+                    print(f"Running {name} workload...", file=sys.stderr)
+                    results[name] = await self.run_workload(client, name)
+        finally:
+            await app.router.shutdown()
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+
+        return {
+            "meta": {
+                "timestamp": datetime.utcnow().isoformat(),
+                "git_revision": git_revision(),
+                "python": platform.python_version(),
+                "database": "mongodb" if self.args.mongo_url else "mongomock",
+                "graphics": self.args.graphics,
+                "projects_per_template": self.args.projects_per_template,
+                "concurrency": self.args.concurrency,
+                "requests_per_workload": self.args.requests,
+                "seed_seconds": round(seed_seconds, 3)
+            },
+            "workloads": results
+        }
+
+
+def compare_with_baseline(report, baseline, tolerance):
+    """Annotate each workload with deltas against the baseline; return the regressions"""
+    regressions = []
+    for name, current in report["workloads"].items():
+        previous = baseline.get("workloads", {}).get(name)
+        if not previous or "p50_ms" not in current or "p50_ms" not in previous:
+            continue
+        delta = {}
+        for metric in ("p50_ms", "p99_ms", "throughput_rps"):
+            if previous.get(metric):
+                delta[metric] = round((current[metric] - previous[metric]) / previous[metric], 4)
+        current["baseline_delta"] = delta
+        if delta.get("p99_ms", 0) > tolerance or delta.get("throughput_rps", 0) < -tolerance:
+            regressions.append(name)
+    report["regressions"] = regressions
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the Motion Graphics Studio API in-process")
+    parser.add_argument("--graphics", type=int, default=1000, help="motion graphics to seed (1k to 1M)")
+    parser.add_argument("--projects-per-template", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=500, help="requests per workload")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--file-size", type=int, default=64 * 1024, help="bytes per uploaded/downloaded file")
+    parser.add_argument("--workloads", nargs="+", choices=WORKLOADS, default=WORKLOADS)
+    parser.add_argument("--mongo-url", help="benchmark against this MongoDB instead of mongomock")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for reproducible datasets")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative p99/throughput regression")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = asyncio.run(LoadBenchmark(args).run())
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_with_baseline(report, json.load(f), args.tolerance)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if regressions:
+        print(f"Regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Render Engine Microbenchmark for the Motion Graphics Studio templates
+Renders every entry in DEFAULT_TEMPLATES through the same scene/rasterize/encode
+path used by /api/export, sweeping resolutions, durations, quality levels and
+formats. Reports frames/sec, ms/frame, peak memory and output size per run as
+JSON with a stable key order so results can be diffed against a baseline.
+
+Usage:
+    python render_benchmark.py --output render_bench.json
+    python render_benchmark.py --templates counter particles --resolutions 1920x1080
+    python render_benchmark.py --baseline render_bench.json --tolerance 0.15
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "motionstock_benchmark")
+
+import server  # noqa: E402
+
+DEFAULT_RESOLUTIONS = ["320x240", "800x600", "1920x1080"]
+DEFAULT_DURATIONS = [1000, 5000]
+DEFAULT_QUALITIES = ["low", "medium", "high"]
+DEFAULT_FORMATS = ["mp4", "gif", "webm", "vector"]
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=Path(__file__).parent, text=True).strip()
+    except Exception:
+        return None
+
+
+def render(template, width, height, duration, quality, fmt, path):
+    return server.render_animation(
+        template["type"], template["default_config"], path, fmt,
+        width, height, duration, quality, {"template_type": template["type"]}
+    )
+
+
+def run_case(template, width, height, duration, quality, fmt, work_dir):
+    # Without ffmpeg /api/export writes video formats as raw frames; report what was written
+    fmt = server.export_output_format(fmt)
+    path = Path(work_dir) / f"{template['type']}_{width}x{height}_{duration}_{quality}.{fmt}"
+    # tracemalloc hooks every allocation, so timing and peak memory are
+    # measured in separate passes to keep its overhead out of ms/frame
+    started = time.perf_counter()
+    frames = render(template, width, height, duration, quality, fmt, path)
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    try:
+        render(template, width, height, duration, quality, fmt, path)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    output_size = path.stat().st_size
+    path.unlink()
+    return {
+        "template": template["name"],
+        "template_type": template["type"],
+        "resolution": f"{width}x{height}",
+        "duration_ms": duration,
+        "quality": quality,
+        "format": fmt,
+        "frames": frames,
+        "fps": round(frames / elapsed, 2) if elapsed else None,
+        "ms_per_frame": round(elapsed * 1000 / frames, 4) if frames else None,
+        "peak_memory_bytes": peak,
+        "output_bytes": output_size
+    }
+
+
+def case_key(result):
+    return "|".join(str(result[k]) for k in ("template_type", "resolution", "duration_ms", "quality", "format"))
+
+
+def compare_with_baseline(report, baseline, tolerance):
+    """Annotate results with ms/frame deltas; return the keys that regressed"""
+    previous = {case_key(r): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in report["results"]:
+        old = previous.get(case_key(result))
+        if not old or not old.get("ms_per_frame"):
+            continue
+        delta = round((result["ms_per_frame"] - old["ms_per_frame"]) / old["ms_per_frame"], 4)
+        result["baseline_delta_ms_per_frame"] = delta
+        if delta > tolerance:
+            regressions.append(case_key(result))
+    report["regressions"] = regressions
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the per-template render engine")
+    parser.add_argument("--templates", nargs="+", help="template types to run (default: all)")
+    parser.add_argument("--resolutions", nargs="+", default=DEFAULT_RESOLUTIONS)
+    parser.add_argument("--durations", nargs="+", type=int, default=DEFAULT_DURATIONS, help="milliseconds")
+    parser.add_argument("--qualities", nargs="+", choices=DEFAULT_QUALITIES, default=DEFAULT_QUALITIES)
+    parser.add_argument("--formats", nargs="+", default=DEFAULT_FORMATS)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative ms/frame regression")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    templates = [t for t in server.DEFAULT_TEMPLATES if not args.templates or t["type"] in args.templates]
+
+    formats = list(dict.fromkeys(server.export_output_format(fmt) for fmt in args.formats))
+    if not server.FFMPEG_BINARY and formats != args.formats:
+        print(f"ffmpeg not found; benchmarking formats {', '.join(formats)}", file=sys.stderr)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="motionstock_render_") as work_dir:
+        for template in templates:
+            for resolution in args.resolutions:
+                width, height = (int(v) for v in resolution.lower().split("x"))
+                for duration in args.durations:
+                    for quality in args.qualities:
+                        for fmt in formats:
+                            print(f"Rendering {template['name']} {resolution} {duration}ms {quality} {fmt}...", file=sys.stderr)
+                            results.append(run_case(template, width, height, duration, quality, fmt, work_dir))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "encoder": "ffmpeg" if server.FFMPEG_BINARY else "raw",
+        },
+        "results": sorted(results, key=case_key)
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_with_baseline(report, json.load(f), args.tolerance)
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if regressions:
+        print(f"Regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
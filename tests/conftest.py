@@ -0,0 +1,22 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+# server.py reads these at import time; the unit tests never open a connection
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "motionstock_test")
+
+import server  # noqa: E402
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """An in-memory Mongo standing in for server.db"""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    database = mongomock_motor.AsyncMongoMockClient()["motionstock_test"]
+    monkeypatch.setattr(server, "db", database)
+    return database
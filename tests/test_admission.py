@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+import server
+
+
+def test_limiter_queues_then_rejects():
+    async def scenario():
+        limiter = server.AdmissionLimiter("test", 2, 1, 0.05)
+        await limiter.acquire()
+        await limiter.acquire()
+        queued = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+
+        # The queue holds one waiter, so the next request is turned away
+        with pytest.raises(server.AdmissionRejected) as rejected:
+            await limiter.acquire()
+        assert rejected.value.status_code == 429 and rejected.value.retry_after >= 1
+
+        # A release hands the slot straight to the waiter
+        limiter.release(0.01)
+        await queued
+        assert limiter.in_flight == 2
+
+        # A waiter that is never handed a slot times out with 503
+        with pytest.raises(server.AdmissionRejected) as timed_out:
+            await limiter.acquire()
+        assert timed_out.value.status_code == 503
+
+        limiter.release()
+        limiter.release()
+        assert limiter.in_flight == 0 and not limiter.waiters
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_leak():
+    async def scenario():
+        limiter = server.AdmissionLimiter("test", 1, 1, 1.0)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        limiter.release()
+        assert limiter.in_flight == 0 and not limiter.waiters
+        await limiter.acquire()
+        assert limiter.in_flight == 1
+
+    asyncio.run(scenario())
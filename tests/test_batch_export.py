@@ -0,0 +1,28 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+
+import server
+
+
+def test_variant_count_matches_expansion():
+    batch = server.BatchExportRequest(project_id="p", overrides=[{"a": 1}, {"a": 2}], sweep={"b": [1, 2, 3], "c": ["x", "y"]})
+    variants = server.batch_variants(batch)
+    assert server.batch_variant_count(batch) == len(variants) == 12
+    assert {"a": 2, "b": 3, "c": "y"} in variants
+    assert server.batch_variant_count(server.BatchExportRequest(project_id="p")) == 1
+
+
+def test_variant_count_does_not_expand():
+    batch = server.BatchExportRequest(project_id="p", sweep={f"k{i}": list(range(40)) for i in range(5)})
+    started = time.perf_counter()
+    assert server.batch_variant_count(batch) == 40 ** 5
+    assert time.perf_counter() - started < 0.1
+
+
+def test_empty_sweep_values_are_rejected():
+    batch = server.BatchExportRequest(project_id="p", sweep={"b": [1, 2], "c": []})
+    with pytest.raises(HTTPException) as rejected:
+        server.batch_variant_count(batch)
+    assert rejected.value.status_code == 422
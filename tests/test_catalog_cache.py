@@ -0,0 +1,87 @@
+import asyncio
+from collections import OrderedDict
+
+import pytest
+from starlette.requests import Request
+
+import server
+
+
+def make_request(path: str, if_none_match: str = None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": headers})
+
+
+@pytest.fixture(autouse=True)
+def catalog(monkeypatch):
+    monkeypatch.setattr(server, "catalog_cache", OrderedDict())
+    monkeypatch.setattr(server, "catalog_version", "v1")
+    builds = []
+
+    async def build():
+        builds.append(1)
+        return {"categories": ["a", "b"]}
+
+    return builds, build
+
+
+def respond(build, path="/api/categories", if_none_match=None, **params):
+    return asyncio.run(server.catalog_response(make_request(path, if_none_match), build, **params))
+
+
+def test_matching_etag_returns_304(catalog):
+    builds, build = catalog
+    first = respond(build)
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and etag.startswith('W/"v1-')
+
+    # Weak comparison: the tag matches with or without W/, and among other tags
+    for header in (etag, etag[2:], f'"other", {etag}'):
+        cached = respond(build, if_none_match=header)
+        assert cached.status_code == 304 and cached.headers["etag"] == etag and not cached.body
+    assert respond(build, if_none_match='W/"v0-stale"').status_code == 200
+    assert len(builds) == 1
+
+
+def test_version_bump_changes_etag(catalog, monkeypatch):
+    builds, build = catalog
+    etag = respond(build).headers["etag"]
+    # What refresh_catalog_version does when the templates change
+    monkeypatch.setattr(server, "catalog_version", "v2")
+    server.catalog_cache.clear()
+    fresh = respond(build, if_none_match=etag)
+    assert fresh.status_code == 200 and fresh.headers["etag"].startswith('W/"v2-')
+    assert len(builds) == 2
+
+
+def test_refresh_catalog_version_follows_templates(db):
+    async def scenario():
+        await server.refresh_catalog_version()
+        server.catalog_cache["/api/categories?"] = ("tag", b"{}")
+        before = server.catalog_version
+        await db.animated_templates.insert_one({"id": "t1", "created_at": "2024-01-01"})
+        await server.refresh_catalog_version()
+        return before, server.catalog_version
+
+    before, after = asyncio.run(scenario())
+    assert before != after and not server.catalog_cache
+
+
+def test_lru_evicts_least_recently_used(catalog, monkeypatch):
+    builds, build = catalog
+    monkeypatch.setattr(server, "CATALOG_CACHE_MAX_ENTRIES", 2)
+    respond(build, category="a")
+    respond(build, category="b")
+    respond(build, category="a")  # a is now the most recently used
+    respond(build, category="c")
+    assert list(server.catalog_cache) == ["/api/categories?category=a", "/api/categories?category=c"]
+    assert len(builds) == 3
+    respond(build, category="b")
+    assert len(builds) == 4 and len(server.catalog_cache) == 2
+
+
+def test_cache_key_ignores_field_order_and_missing_params(catalog):
+    builds, build = catalog
+    respond(build, "/api/templates", fields="name, id", category=None)
+    respond(build, "/api/templates", fields="id,name,id")
+    assert list(server.catalog_cache) == ["/api/templates?fields=id%2Cname"] and len(builds) == 1
@@ -0,0 +1,83 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import server
+
+
+@pytest.fixture
+def exports_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "EXPORTS_DIR", tmp_path)
+    return tmp_path
+
+
+def add_artifacts(db, exports_dir, artifacts):
+    """Write a placeholder file per (name, size, idle hours) and track it with the fake size"""
+    now = datetime.utcnow()
+    records = []
+    for name, size, idle_hours in artifacts:
+        path = exports_dir / name
+        path.write_bytes(b"x")
+        records.append(server.export_artifact(path, size=size, last_accessed_at=now - timedelta(hours=idle_hours)))
+    return db.export_artifacts.insert_many(records)
+
+
+def remaining(db, exports_dir):
+    async def tracked():
+        return {artifact["id"] async for artifact in db.export_artifacts.find({}, {"_id": 0, "id": 1})}
+
+    return asyncio.run(tracked()), {path.name for path in exports_dir.iterdir()}
+
+
+def test_ttl_expires_idle_artifacts(db, exports_dir, monkeypatch):
+    monkeypatch.setattr(server, "EXPORT_TTL_SECONDS", 3600)
+    monkeypatch.setattr(server, "EXPORT_DISK_QUOTA_BYTES", 0)
+    asyncio.run(add_artifacts(db, exports_dir, [("old.mp4", 500, 5), ("edge.gif", 700, 0.9), ("new.webm", 300, 0)]))
+
+    result = asyncio.run(server.sweep_export_artifacts())
+    assert result == {"expired": 1, "evicted": 0, "freed_bytes": 500, "total_bytes": 1000}
+    assert remaining(db, exports_dir) == ({"edge.gif", "new.webm"}, {"edge.gif", "new.webm"})
+
+
+def test_quota_evicts_least_recently_used(db, exports_dir, monkeypatch):
+    monkeypatch.setattr(server, "EXPORT_TTL_SECONDS", 0)
+    monkeypatch.setattr(server, "EXPORT_DISK_QUOTA_BYTES", 1000)
+    asyncio.run(add_artifacts(db, exports_dir, [
+        ("a.mp4", 400, 4), ("b.mp4", 300, 3), ("c.mp4", 200, 2), ("d.mp4", 500, 1), ("e.mp4", 100, 0)
+    ]))
+
+    # 1500 bytes against a 1000 byte quota: a and b (700) go, oldest first
+    result = asyncio.run(server.sweep_export_artifacts())
+    assert result == {"expired": 0, "evicted": 2, "freed_bytes": 700, "total_bytes": 800}
+    assert remaining(db, exports_dir) == ({"c.mp4", "d.mp4", "e.mp4"}, {"c.mp4", "d.mp4", "e.mp4"})
+
+    # Under the quota nothing more is evicted
+    assert asyncio.run(server.sweep_export_artifacts())["evicted"] == 0
+
+
+def test_ttl_runs_before_quota(db, exports_dir, monkeypatch):
+    monkeypatch.setattr(server, "EXPORT_TTL_SECONDS", 3600)
+    monkeypatch.setattr(server, "EXPORT_DISK_QUOTA_BYTES", 600)
+    asyncio.run(add_artifacts(db, exports_dir, [("stale.gif", 900, 48), ("a.mp4", 400, 0.5), ("b.mp4", 400, 0.1)]))
+
+    result = asyncio.run(server.sweep_export_artifacts())
+    assert result == {"expired": 1, "evicted": 1, "freed_bytes": 1300, "total_bytes": 400}
+    assert remaining(db, exports_dir) == ({"b.mp4"}, {"b.mp4"})
+
+
+def test_cleanup_spares_recent_untracked_files(db, exports_dir):
+    asyncio.run(add_artifacts(db, exports_dir, [("tracked.mp4", 10, 0), ("gone.mp4", 10, 0)]))
+    (exports_dir / "gone.mp4").unlink()
+    old = time.time() - server.EXPORT_ORPHAN_GRACE_SECONDS - 60
+    for name in ("orphan.mp4", "crashed.gif.part"):
+        (exports_dir / name).write_bytes(b"x")
+        os.utime(exports_dir / name, (old, old))
+    # Another worker may still be finishing this one
+    (exports_dir / "rendering.webm.part").write_bytes(b"x")
+
+    result = asyncio.run(server.cleanup_export_dir())
+    assert result == {"partial_files": 1, "orphaned_files": 1, "missing_files": 1}
+    assert remaining(db, exports_dir) == ({"tracked.mp4"}, {"tracked.mp4", "rendering.webm.part"})
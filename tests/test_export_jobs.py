@@ -0,0 +1,98 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import server
+
+
+@pytest.fixture
+def exports_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "EXPORTS_DIR", tmp_path)
+    return tmp_path
+
+
+def export_job(job_id: str = "job", **fields):
+    now = datetime.utcnow()
+    return {
+        "id": job_id,
+        "project_id": "p",
+        "project_name": "Job",
+        "template_id": "t",
+        "template_type": "counter",
+        "config": {},
+        "settings": {},
+        "format": "mgraw",
+        "width": 40,
+        "height": 30,
+        "duration": 500,
+        "quality": "low",
+        "fps": 15,
+        "frames_total": 8,
+        "segment_frames": 4,
+        "segments_total": 2,
+        "segments_done": [],
+        "attempts": 0,
+        "client_id": "c",
+        "status": "queued",
+        "lease_until": None,
+        "created_at": now,
+        "updated_at": now,
+        **fields
+    }
+
+
+def expire_lease(db, job_id: str):
+    return db.export_jobs.update_one({"id": job_id}, {"$set": {"lease_until": datetime.utcnow() - timedelta(seconds=1)}})
+
+
+def test_claim_is_exclusive_and_owned(db):
+    async def scenario():
+        await db.export_jobs.insert_one(export_job())
+        first = await server.claim_export_job("job")
+        assert await server.claim_export_job("job") is None
+        await expire_lease(db, "job")
+        second = await server.claim_export_job("job")
+        assert first["lease_owner"] != second["lease_owner"]
+        with pytest.raises(server.ExportJobLeaseLost):
+            await server.update_leased_job(first, {"$set": server.renewed_lease()})
+        await server.update_leased_job(second, {"$set": server.renewed_lease()})
+
+    asyncio.run(scenario())
+
+
+def test_job_stops_when_lease_is_taken_over(db, exports_dir, monkeypatch):
+    real_run = server.render_scheduler.run
+
+    async def render_then_lose_lease(priority, client_id, fn, *args):
+        result = await real_run(priority, client_id, fn, *args)
+        # Another worker reclaims the job while this one is still rendering
+        await db.export_jobs.update_one({"id": "job"}, {"$set": {"lease_owner": "someone-else"}})
+        return result
+
+    monkeypatch.setattr(server.render_scheduler, "run", render_then_lose_lease)
+
+    async def scenario():
+        await db.export_jobs.insert_one(export_job())
+        await server.run_export_job("job")
+        return await db.export_jobs.find_one({"id": "job"}), await db.export_artifacts.count_documents({})
+
+    job, artifacts = asyncio.run(scenario())
+    assert job["status"] == "running" and job["lease_owner"] == "someone-else"
+    assert job["segments_done"] == []
+    assert artifacts == 0
+    # The checkpoint directory belongs to the new owner and is left in place
+    assert server.export_job_dir("job").exists()
+    assert not list(exports_dir.glob("*.mgraw"))
+
+
+def test_job_completes_under_its_own_lease(db, exports_dir):
+    async def scenario():
+        await db.export_jobs.insert_one(export_job())
+        await server.run_export_job("job")
+        return await db.export_jobs.find_one({"id": "job"}), await db.export_artifacts.count_documents({})
+
+    job, artifacts = asyncio.run(scenario())
+    assert job["status"] == "completed" and job["lease_owner"] is None
+    assert artifacts == 1 and (exports_dir / job["export_id"]).exists()
+    assert not server.export_job_dir("job").exists()
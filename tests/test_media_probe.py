@@ -0,0 +1,54 @@
+import struct
+
+import server
+
+
+def box(kind: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+def mp4_boxes(codec=b"avc1", width=1920, height=1080, timescale=30000, delta=1001, samples=300, version=0):
+    """Minimal ftyp and moov boxes: one sound track, then one video track"""
+    if version == 1:
+        mvhd = box(b"mvhd", b"\x01\0\0\0" + struct.pack(">QQIQ", 0, 0, 1000, 10010) + b"\0" * 80)
+    else:
+        mvhd = box(b"mvhd", b"\0" * 4 + struct.pack(">IIII", 0, 0, 1000, 10010) + b"\0" * 80)
+    tkhd = box(b"tkhd", b"\0\0\0\x07" + struct.pack(">IIIII", 0, 0, 1, 0, 10010) + b"\0" * 52 + struct.pack(">II", width << 16, height << 16))
+    mdhd = box(b"mdhd", b"\0" * 4 + struct.pack(">IIII", 0, 0, timescale, samples * delta) + b"\0" * 4)
+    hdlr = box(b"hdlr", b"\0" * 8 + b"vide" + b"\0" * 12 + b"Video\0")
+    sample_entry = struct.pack(">I4s", 86, codec) + b"\0" * 6 + b"\0\x01" + b"\0" * 16 + struct.pack(">HH", width, height) + b"\0" * 50
+    stsd = box(b"stsd", b"\0" * 4 + struct.pack(">I", 1) + sample_entry)
+    stts = box(b"stts", b"\0" * 4 + struct.pack(">III", 1, samples, delta))
+    sound = box(b"trak", box(b"mdia", box(b"hdlr", b"\0" * 8 + b"soun" + b"\0" * 12)))
+    video = box(b"trak", tkhd + box(b"mdia", mdhd + hdlr + box(b"minf", box(b"stbl", stsd + stts))))
+    return box(b"ftyp", b"isom\0\0\0\0isom"), box(b"moov", mvhd + sound + video)
+
+
+def test_probe_reads_moov_after_large_mdat(tmp_path):
+    ftyp, moov = mp4_boxes()
+    path = tmp_path / "clip.mov"
+    with open(path, "wb") as f:
+        f.write(ftyp)
+        # A 4 GB mdat with a 64-bit size; the file is sparse, so only the header is written
+        mdat_size = 4 * 1024 ** 3
+        f.write(struct.pack(">I4sQ", 1, b"mdat", mdat_size))
+        f.seek(len(ftyp) + mdat_size)
+        f.write(moov)
+
+    assert server.probe_media(path) == {"duration": 10.01, "width": 1920, "height": 1080, "fps": 29.97, "codec": "avc1"}
+
+
+def test_probe_version_1_headers(tmp_path):
+    ftyp, moov = mp4_boxes(codec=b"hvc1", width=1280, height=720, timescale=25, delta=1, samples=50, version=1)
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(ftyp + moov + box(b"mdat", b"x" * 10))
+
+    probe = server.probe_media(path)
+    assert probe["fps"] == 25 and probe["codec"] == "hvc1"
+    assert (probe["width"], probe["height"]) == (1280, 720)
+
+
+def test_probe_unreadable_file(tmp_path):
+    path = tmp_path / "junk.mp4"
+    path.write_bytes(b"garbage!" * 10)
+    assert server.probe_media(path) == {}
@@ -0,0 +1,53 @@
+import random
+
+import numpy as np
+
+import server
+
+
+def distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def blocky_frame(rng: np.random.Generator) -> np.ndarray:
+    return np.kron(rng.integers(0, 255, (8, 8)), np.ones((4, 4))).astype(np.uint8)
+
+
+def test_frame_phash_tolerates_small_changes():
+    rng = np.random.default_rng(1)
+    frame, other = blocky_frame(rng), blocky_frame(rng)
+    # Brightness, contrast and noise changes keep the hash close
+    altered = np.clip(frame.astype(int) * 0.9 + 15 + rng.normal(0, 4, frame.shape), 0, 255).astype(np.uint8)
+    assert distance(server.frame_phash(frame), server.frame_phash(altered)) <= 6
+    assert distance(server.frame_phash(frame), server.frame_phash(other)) >= 20
+
+
+def test_multi_index_search_is_exact():
+    rng = random.Random(3)
+    index = server.MultiIndexHash()
+    values = {f"g{i}": rng.getrandbits(256) for i in range(2000)}
+    query = values["g0"]
+    for i in range(20):
+        near = query
+        for bit in rng.sample(range(256), i * 2 + 1):
+            near ^= 1 << bit
+        values[f"n{i}"] = near
+    for graphic_id, value in values.items():
+        index.add(value, graphic_id)
+
+    for radius in (0, 16, 40, 64):
+        expected = sorted((distance(query, value), graphic_id) for graphic_id, value in values.items() if distance(query, value) <= radius)
+        assert index.search(query, radius) == expected
+
+
+def test_multi_index_remove():
+    index = server.MultiIndexHash()
+    index.add(1, "a")
+    index.add(1, "b")
+    index.add(3, "c")
+    index.remove(1, "a")
+    assert index.search(1, 1) == [(0, "b"), (1, "c")]
+    index.remove(1, "b")
+    index.remove(1, "missing")
+    assert index.search(1, 1) == [(1, "c")]
+    assert 1 not in index.values and all(1 not in bucket for table in index.tables for bucket in table.values())
@@ -0,0 +1,63 @@
+import asyncio
+import copy
+import random
+
+import server
+
+
+def random_document(rng: random.Random, depth: int = 0):
+    roll = rng.random()
+    if depth < 3 and roll < 0.3:
+        return {f"k{rng.randrange(6)}": random_document(rng, depth + 1) for _ in range(rng.randrange(4))}
+    if depth < 3 and roll < 0.5:
+        return [random_document(rng, depth + 1) for _ in range(rng.randrange(4))]
+    return rng.choice([rng.randrange(100), f"s{rng.randrange(5)}", None, True, rng.random()])
+
+
+def test_json_diff_round_trip():
+    rng = random.Random(0)
+    for _ in range(500):
+        old, new = random_document(rng), random_document(rng)
+        original = copy.deepcopy(old)
+        assert server.apply_patch(old, server.json_diff(old, new)) == new
+        assert old == original  # the patch is applied to a copy
+
+
+def test_json_diff_identical_documents():
+    document = {"name": "P", "config": {"data": [{"value": 1}], "color": "#fff"}}
+    assert server.json_diff(document, copy.deepcopy(document)) == []
+
+
+def test_snapshot_every_interval(monkeypatch):
+    monkeypatch.setattr(server, "PROJECT_SNAPSHOT_INTERVAL", 5)
+    old, new = {"config": {"a": 1, "b": list(range(50))}}, {"config": {"a": 2, "b": list(range(50))}}
+    kinds = {version: server.project_version_record("p", version, old, new)["kind"] for version in range(1, 13)}
+    assert [version for version, kind in kinds.items() if kind == "snapshot"] == [1, 6, 11]
+    monkeypatch.setattr(server, "PROJECT_SNAPSHOT_INTERVAL", 1)
+    assert server.project_version_record("p", 3, old, new)["kind"] == "snapshot"
+
+
+def test_load_project_version_replays_diffs(db, monkeypatch):
+    monkeypatch.setattr(server, "PROJECT_SNAPSHOT_INTERVAL", 4)
+    rng = random.Random(1)
+    states = {1: {"name": "P", "config": {"data": []}}}
+    for version in range(2, 11):
+        state = copy.deepcopy(states[version - 1])
+        state["config"]["data"].append({"value": rng.randrange(100)})
+        if rng.random() < 0.3:
+            state["name"] = f"P{version}"
+        states[version] = state
+
+    async def scenario():
+        await db.project_versions.insert_one(server.project_snapshot({"id": "p", **states[1]}))
+        for version in range(2, 11):
+            await db.project_versions.insert_one(server.project_version_record("p", version, states[version - 1], states[version]))
+        loaded = {version: await server.load_project_version("p", version) for version in states}
+        missing = await server.load_project_version("p", 11)
+        return loaded, missing
+
+    loaded, missing = asyncio.run(scenario())
+    for version, state in states.items():
+        assert {field: loaded[version][field] for field in server.VERSIONED_FIELDS} == state
+        assert loaded[version]["version"] == version
+    assert missing is None
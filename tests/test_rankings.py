@@ -0,0 +1,81 @@
+import asyncio
+import math
+from datetime import timedelta
+
+import server
+
+
+def test_trending_exponent_halves_per_half_life():
+    at = server.TRENDING_EPOCH + timedelta(days=40)
+    later = at + timedelta(hours=server.TRENDING_HALF_LIFE_HOURS)
+    # A download one half-life later counts twice as much as one now
+    assert math.isclose(server.trending_exponent(later) - server.trending_exponent(at), math.log(2))
+    assert server.trending_exponent(server.TRENDING_EPOCH) == 0
+
+
+def test_add_log_scores(db):
+    exponents = [0.0, 3.0, 1200.0, 1199.5]
+
+    async def scenario():
+        await db.rankings.insert_one({"id": "a"})
+        scores = []
+        for exponent in exponents:
+            ranking = await db.rankings.find_one_and_update(
+                {"id": "a"},
+                [{"$set": {"trend_score": server.add_log_scores("trend_score", exponent)}}],
+                return_document=server.ReturnDocument.AFTER
+            )
+            scores.append(ranking["trend_score"])
+        return scores
+
+    scores = asyncio.run(scenario())
+    # The first score is taken as is, later ones sum without overflowing exp()
+    assert scores[0] == 0.0
+    assert math.isclose(scores[1], math.log(1 + math.exp(3)))
+    assert math.isclose(scores[2], 1200 + math.log1p(math.exp(scores[1] - 1200)))
+    assert math.isclose(scores[3], 1200 + math.log1p(math.exp(-0.5)))
+
+
+def test_record_ranking_download_decays_older_downloads(db, monkeypatch):
+    times = iter([server.TRENDING_EPOCH + timedelta(hours=hours) for hours in (0, 0, 48)])
+
+    class FakeDatetime(server.datetime):
+        @classmethod
+        def utcnow(cls):
+            return next(times)
+
+    monkeypatch.setattr(server, "datetime", FakeDatetime)
+    monkeypatch.setattr(server, "ranking_index", server.RankingIndex())
+    monkeypatch.setattr(server, "TRENDING_DECAY", math.log(2) / (24 * 3600))
+
+    async def scenario():
+        for graphic_id in ("old", "old", "new"):
+            await server.record_ranking_download({"id": graphic_id, "category": "overlays"})
+        return await db.rankings.find({}, {"_id": 0}).to_list(length=None)
+
+    rankings = {ranking["id"]: ranking for ranking in asyncio.run(scenario())}
+    assert rankings["old"]["download_count"] == 2 and rankings["new"]["download_count"] == 1
+    # Two downloads two half-lives ago are worth half of one download now
+    assert math.isclose(rankings["new"]["trend_score"] - rankings["old"]["trend_score"], math.log(2))
+    assert [graphic_id for _, graphic_id in server.ranking_index.top[("trending", "overlays")]] == ["new", "old"]
+    assert [graphic_id for _, graphic_id in server.ranking_index.top[("popular", "overlays")]] == ["old", "new"]
+
+
+def test_refresh_picks_up_other_workers_downloads(db, monkeypatch):
+    monkeypatch.setattr(server, "ranking_index", server.RankingIndex())
+
+    async def scenario():
+        await db.motion_graphics.insert_many([
+            {"id": "a", "category": "overlays", "download_count": 3},
+            {"id": "b", "category": "overlays", "download_count": 0}
+        ])
+        await server.load_rankings()
+        before = server.ranking_index.top[("popular", "overlays")]
+        # Another worker records a download straight into the shared collection
+        await db.rankings.insert_one({"id": "c", "category": "overlays", "download_count": 9, "trend_score": 50.0})
+        await server.load_ranking_lists()
+        return before, server.ranking_index.top[("popular", "overlays")]
+
+    before, after = asyncio.run(scenario())
+    assert [graphic_id for _, graphic_id in before] == ["a"]
+    assert [graphic_id for _, graphic_id in after] == ["c", "a"]
@@ -0,0 +1,48 @@
+import asyncio
+import time
+
+import pytest
+
+import server
+
+
+def test_priorities_reservation_and_fairness():
+    async def scenario():
+        scheduler = server.RenderScheduler(3, 1)
+        order = []
+
+        def job(name, seconds=0.03):
+            order.append(name)
+            time.sleep(seconds)
+            return name
+
+        batch_a = [asyncio.create_task(scheduler.run("batch", "A", job, f"A{i}")) for i in range(6)]
+        batch_b = [asyncio.create_task(scheduler.run("batch", "B", job, f"B{i}")) for i in range(2)]
+        await asyncio.sleep(0.005)
+        # One worker is held back for interactive work
+        assert scheduler.stats()["classes"]["batch"]["running"] == 2
+
+        started = time.perf_counter()
+        assert await scheduler.run("interactive", "C", job, "I", 0) == "I"
+        assert time.perf_counter() - started < 0.02
+
+        export = asyncio.create_task(scheduler.run("export", "D", job, "E"))
+        await asyncio.gather(*batch_a, *batch_b, export)
+        # Clients take turns within a class, and exports go before queued batch jobs
+        assert order.index("B1") < order.index("A5")
+        assert order.index("E") < order.index("A5")
+        return scheduler.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["classes"]["batch"]["completed"] == 8 and stats["classes"]["batch"]["queued"] == 0
+    assert sum(c["running"] for c in stats["classes"].values()) == 0
+
+
+def test_job_errors_propagate():
+    async def scenario():
+        scheduler = server.RenderScheduler(1, 0)
+        with pytest.raises(ZeroDivisionError):
+            await scheduler.run("export", "D", lambda: 1 / 0)
+        return await scheduler.run("export", "D", lambda: "ok")
+
+    assert asyncio.run(scenario()) == "ok"
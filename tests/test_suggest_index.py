@@ -0,0 +1,82 @@
+import random
+
+import server
+
+WORDS = ["fire", "fizz", "flame", "glow", "ice", "iron", "smoke", "spark"]
+PREFIXES = ["f", "fi", "i", "s", "sp", "g", "fir", "flam", "smoke s", "x"]
+
+
+def brute_force(graphics, prefix, limit):
+    """Rank every suggestion under ``prefix`` from scratch"""
+    prefix = server.normalize_suggest_text(prefix)
+    scores = {}
+    for graphic in graphics.values():
+        words = server.normalize_suggest_text(graphic["title"]).split()
+        if any(" ".join(words[i:]).startswith(prefix) for i in range(len(words))):
+            scores[("title", graphic["id"])] = (graphic["title"], graphic["download_count"])
+        for tag in {server.normalize_suggest_text(t) for t in graphic["tags"]}:
+            if tag.startswith(prefix):
+                text, score = scores.get(("tag", tag), (tag, 0))
+                scores[("tag", tag)] = (text, score + graphic["download_count"])
+    ranked = sorted(scores.items(), key=lambda item: (-item[1][1], item[1][0].lower(), item[0][1]))
+    return [(kind, value if kind == "title" else None, score) for (kind, value), (_, score) in ranked[:limit]]
+
+
+def suggested(index, prefix, limit):
+    return [(s["type"], s["id"], s["score"]) for s in index.suggest(prefix, limit)]
+
+
+def test_top_k_matches_brute_force_through_edits(monkeypatch):
+    # A small k keeps the maintained lists full, so evictions are exercised
+    monkeypatch.setattr(server, "SUGGEST_TOP_K", 5)
+    rng = random.Random(2)
+    graphics = {}
+
+    def make(graphic_id):
+        return {
+            "id": graphic_id,
+            "title": " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))),
+            "tags": [w.upper() if rng.random() < 0.2 else w for w in rng.sample(WORDS, rng.randint(0, 2))],
+            "download_count": rng.randint(0, 3)
+        }
+
+    for i in range(100):
+        graphics[f"g{i}"] = make(f"g{i}")
+    index = server.SuggestIndex()
+    index.build(list(graphics.values()))
+
+    def check():
+        for prefix in PREFIXES:
+            assert suggested(index, prefix, 5) == brute_force(graphics, prefix, 5), prefix
+
+    check()
+    for step in range(1500):
+        roll = rng.random()
+        graphic_id = rng.choice(list(graphics))
+        if roll < 0.6:
+            index.record_download(graphic_id)
+            graphics[graphic_id]["download_count"] += 1
+        elif roll < 0.75:
+            graphics[f"n{step}"] = make(f"n{step}")
+            index.add(graphics[f"n{step}"])
+        elif roll < 0.9:
+            # A rename keeps the downloads but replaces the title and tags
+            renamed = {**make(graphic_id), "download_count": graphics[graphic_id]["download_count"]}
+            graphics[graphic_id] = renamed
+            index.add(renamed)
+        else:
+            del graphics[graphic_id]
+            index.remove(graphic_id)
+        if step % 50 == 0:
+            check()
+    check()
+
+
+def test_empty_and_unknown_prefixes():
+    index = server.SuggestIndex()
+    index.build([{"id": "a", "title": "Fire Burst", "tags": ["fire"], "download_count": 0}])
+    assert index.suggest("  ", 10) == []
+    assert index.suggest("zzz", 10) == []
+    assert [s["text"] for s in index.suggest("bur", 10)] == ["Fire Burst"]
+    index.remove("a")
+    assert index.suggest("f", 10) == [] and not index.tags
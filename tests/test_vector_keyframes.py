@@ -0,0 +1,32 @@
+import math
+import random
+
+import server
+
+
+def interpolate(keyframes, t):
+    for (t0, v0), (t1, v1) in zip(keyframes, keyframes[1:]):
+        if t0 <= t <= t1:
+            return v0 + (v1 - v0) * (t - t0) / (t1 - t0)
+    return keyframes[-1][1]
+
+
+def test_straight_line_keeps_only_endpoints():
+    times = [i * 1000 / 30 for i in range(90)]
+    keyframes = server.linear_keyframes(times, [2 * t + 5 for t in times], 0.25)
+    assert keyframes == [[times[0], 5.0], [times[-1], round(2 * times[-1] + 5, 3)]]
+
+
+def test_keyframes_stay_within_tolerance():
+    rng = random.Random(7)
+    times = [i * 1000 / 30 for i in range(300)]
+    values = [20 * math.sin(t / 2000) + rng.uniform(-0.1, 0.1) for t in times]
+    keyframes = server.linear_keyframes(times, values, 0.25)
+    assert keyframes[0][0] == times[0] and keyframes[-1][0] == times[-1]
+    assert len(keyframes) < len(times) // 3
+    # 0.001 of slack covers the rounding of kept values
+    assert all(abs(interpolate(keyframes, t) - v) <= 0.25 + 0.001 for t, v in zip(times, values))
+
+
+def test_single_sample():
+    assert server.linear_keyframes([0.0], [3.14159], 0.25) == [[0.0, 3.142]]
@@ -0,0 +1,57 @@
+import os
+import zipfile
+
+import pytest
+
+import server
+
+
+@pytest.fixture
+def pack(tmp_path):
+    path = tmp_path / "pack.zip"
+    contents = {
+        "clips/intro.mp4": os.urandom(300000),
+        "clips/read me é.txt": b"hello world " * 5000,
+        "big.bin": b"z" * 1000
+    }
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("clips/", b"")
+        archive.writestr(zipfile.ZipInfo("clips/intro.mp4"), contents["clips/intro.mp4"])
+        archive.writestr("clips/read me é.txt", contents["clips/read me é.txt"], compress_type=zipfile.ZIP_DEFLATED)
+        with archive.open("big.bin", "w", force_zip64=True) as entry:
+            entry.write(contents["big.bin"])
+        archive.comment = b"x" * 100
+    return path, contents
+
+
+def test_index_lists_files_only(pack):
+    path, contents = pack
+    entries = server.index_zip_entries(path)
+    assert [entry["name"] for entry in entries] == list(contents)
+    assert [entry["size"] for entry in entries] == [len(data) for data in contents.values()]
+
+
+def test_stream_entries_round_trip(pack):
+    path, contents = pack
+    for entry in server.index_zip_entries(path):
+        assert b"".join(server.stream_zip_entry(path, entry)) == contents[entry["name"]]
+
+
+def test_stream_is_bounded_by_indexed_size(tmp_path):
+    path = tmp_path / "bomb.zip"
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("zeros.bin", b"\0" * (5 * server.ZIP_STREAM_CHUNK))
+    entry = server.index_zip_entries(path)[0]
+
+    chunks = list(server.stream_zip_entry(path, entry))
+    assert max(len(chunk) for chunk in chunks) <= server.ZIP_STREAM_CHUNK
+    assert sum(len(chunk) for chunk in chunks) == entry["size"]
+    # An entry that inflates past its declared size is cut off there
+    understated = {**entry, "size": 10}
+    assert b"".join(server.stream_zip_entry(path, understated)) == b"\0" * 10
+
+
+def test_index_rejects_non_zip(tmp_path):
+    path = tmp_path / "bad.zip"
+    path.write_bytes(b"PK not really")
+    assert server.index_zip_entries(path) is None